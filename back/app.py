@@ -1,8 +1,12 @@
 import os
-from flask import Flask, jsonify, request
+import click
+from datetime import datetime
+from flask import Flask, jsonify, request, g
 from dotenv import load_dotenv
 from flask_jwt_extended import JWTManager
-from extensions import mongo 
+from repositories import init_storage
+from compression import init_compression
+from profiling import init_profiling
 from flask_mail import Mail
 from flask_cors import CORS
 
@@ -13,6 +17,54 @@ app = Flask(__name__)
 app.config["MONGO_URI"] = os.getenv("MONGO_URI")
 app.config["JWT_SECRET_KEY"] = os.getenv("SECRET_KEY")
 
+# Motor de almacenamiento: "mongo" (por defecto) o "sqlite" (embebido, SQLITE_PATH)
+app.config["STORAGE_ENGINE"] = os.getenv("STORAGE_ENGINE", "mongo")
+app.config["SQLITE_PATH"] = os.getenv("SQLITE_PATH")
+
+# Compactación de respuestas: carpeta del archivo frío y antigüedad por defecto
+app.config["ANSWERS_ARCHIVE_DIR"] = os.getenv("ANSWERS_ARCHIVE_DIR")
+app.config["ANSWERS_ARCHIVE_MAX_AGE_DAYS"] = int(os.getenv("ANSWERS_ARCHIVE_MAX_AGE_DAYS", 365))
+
+# Carpeta donde se escriben las exportaciones Parquet para análisis
+app.config["EXPORT_DIR"] = os.getenv("EXPORT_DIR")
+# La exportación incremental no toma cambios más nuevos que esto (debe superar
+# READ_MAX_STALENESS_SECONDS, porque lee de secundarios)
+app.config["EXPORT_SAFETY_WINDOW_SECONDS"] = int(os.getenv("EXPORT_SAFETY_WINDOW_SECONDS", 120))
+
+# Ruteo de lecturas (ver extensions.read_db): clave = endpoint o blueprint.
+# Los reportes van a secundarios; la corrección y las escrituras quedan en el primario.
+app.config["READ_MAX_STALENESS_SECONDS"] = int(os.getenv("READ_MAX_STALENESS_SECONDS", 90))
+app.config["READ_ROUTING"] = {
+    "report": "reporting",
+    "users.get_users": "reporting",
+    "answers.get_answers": "reporting",
+    "answers.get_archived_answers": "reporting",
+}
+
+# Jobs en segundo plano (ver jobs.py). Desactivados por defecto.
+app.config["JOBS_ENABLED"] = os.getenv("JOBS_ENABLED", "false").lower() in ["true", "1", "yes"]
+app.config["JOBS_WORKERS"] = int(os.getenv("JOBS_WORKERS", 2))
+app.config["JOBS_POLL_SECONDS"] = int(os.getenv("JOBS_POLL_SECONDS", 30))
+
+# Compresión de respuestas (ver compression.py)
+app.config["COMPRESSION_MIN_SIZE"] = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+app.config["COMPRESSION_GZIP_LEVEL"] = int(os.getenv("COMPRESSION_GZIP_LEVEL", 6))
+app.config["COMPRESSION_BR_LEVEL"] = int(os.getenv("COMPRESSION_BR_LEVEL", 5))
+
+# Profiling por muestreo (ver profiling.py): fracción de requests perfilados
+# (0 = solo los pedidos por un admin con el header X-Profile: 1)
+app.config["PROFILE_SAMPLE_RATE"] = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+app.config["PROFILE_INTERVAL_MS"] = float(os.getenv("PROFILE_INTERVAL_MS", 5))
+app.config["PROFILE_MAX_FILES"] = int(os.getenv("PROFILE_MAX_FILES", 200))
+app.config["PROFILE_DIR"] = os.getenv("PROFILE_DIR")
+
+# Log de eventos de respuestas (ver events.py): demora antes de entregar un
+# evento cuando la base no confirma en orden (mongod sin replica set) y días
+# que se conservan (los borra el job "prune_events")
+app.config["EVENTS_SETTLE_MS"] = int(os.getenv("EVENTS_SETTLE_MS", 1000))
+app.config["EVENTS_RETENTION_DAYS"] = int(os.getenv("EVENTS_RETENTION_DAYS", 30))
+app.config["EVENTS_RELAY_BATCH"] = int(os.getenv("EVENTS_RELAY_BATCH", 500))
+
 # 🔒 Configuración de CORS: solo permite tu frontend
 CORS(app, supports_credentials=True, resources={
     r"/*": {"origins": ["http://localhost:3000", "https://trp.unlu.edu.ar"]}
@@ -26,7 +78,9 @@ app.config["MAIL_USERNAME"] = os.getenv("MAIL_USERNAME")
 app.config["MAIL_DEFAULT_SENDER"] = os.getenv("MAIL_DEFAULT_SENDER")
 
 # Inicializamos las extensiones con la app
-mongo.init_app(app)
+init_storage(app)
+init_compression(app)
+init_profiling(app)
 jwt = JWTManager(app)
 mail = Mail(app)
 
@@ -46,6 +100,23 @@ app.register_blueprint(answers_bp)
 from endpoints.epUsersReport import report_bp
 app.register_blueprint(report_bp)
 
+from endpoints.epExport import export_bp
+app.register_blueprint(export_bp)
+
+from endpoints.epJobs import jobs_bp
+app.register_blueprint(jobs_bp)
+
+from endpoints.epProfiles import profiles_bp
+app.register_blueprint(profiles_bp)
+
+from endpoints.epEvents import events_bp
+app.register_blueprint(events_bp)
+
+# Scheduler de jobs: uno por proceso, coordinados por el lock en la base
+if app.config["JOBS_ENABLED"]:
+    from jobs import start_scheduler
+    start_scheduler(app)
+
 # 🔒 Middleware para restringir orígenes no permitidos
 @app.before_request
 def restrict_origin():
@@ -68,6 +139,47 @@ def restrict_origin():
         return jsonify({"error": "Origin not allowed"}), 403
 
 
+# Deja visible qué política de lectura usó cada request
+@app.after_request
+def tag_read_policy(response):
+    policy = g.get("read_policy")
+    if policy:
+        response.headers["X-Read-Policy"] = policy
+        app.logger.debug("%s %s -> lecturas %s", request.method, request.path, policy)
+    return response
+
+
+# Comando CLI: flask --app app ensure-indexes
+@app.cli.command("ensure-indexes")
+def ensure_indexes_command():
+    from repositories import get_repos
+    get_repos("primary").ensure_indexes()
+    click.echo("Índices creados")
+
+
+# Comando CLI: flask --app app compact-answers [--before 2025-03-01 | --max-age-days 365]
+@app.cli.command("compact-answers")
+@click.option("--before", default=None, help="Archivar intentos anteriores a esta fecha ISO (fin de cuatrimestre)")
+@click.option("--max-age-days", default=None, type=int, help="Archivar intentos con más de N días")
+def compact_answers_command(before, max_age_days):
+    from compaction import compact_answers
+    if before:
+        total = compact_answers(before=datetime.fromisoformat(before))
+    else:
+        total = compact_answers(max_age_days=max_age_days or app.config["ANSWERS_ARCHIVE_MAX_AGE_DAYS"])
+    click.echo(f"{total} respuestas compactadas")
+
+
+# Comando CLI: flask --app app export-analytics [--full] [--collection answers ...]
+@app.cli.command("export-analytics")
+@click.option("--full", is_flag=True, help="Ignorar la marca de agua y exportar todo")
+@click.option("--collection", "collections", multiple=True, help="Colección a exportar (se puede repetir)")
+def export_analytics_command(full, collections):
+    from export import export_all, COLLECTIONS
+    for item in export_all(collections or COLLECTIONS, incremental=not full):
+        click.echo(f"{item['collection']}: {item['rows']} filas -> {item['file'] or '(sin cambios)'}")
+
+
 @app.route('/', methods=['GET'])
 def home():
     return jsonify({"message": "¡Hola desde la API Flask!"})
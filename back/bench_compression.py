@@ -0,0 +1,119 @@
+# bench_compression.py
+# Benchmark de los listados grandes: bytes transferidos y latencia según la
+# codificación negociada (sin comprimir, gzip, Brotli).
+#
+# Corre contra una base SQLite en memoria con datos sintéticos, sin servidor:
+#   python bench_compression.py
+#   python bench_compression.py --users 500 --questions 100 --answers-per-user 80 --runs 20
+#
+# Por cada endpoint y codificación imprime el tamaño del cuerpo (lo que viaja
+# por la red), el tiempo hasta el primer bloque y la latencia total (mediana y
+# p95 de --runs pedidos).
+
+import os
+import sys
+import json
+import gzip
+import time
+import argparse
+import statistics
+
+os.environ.setdefault("STORAGE_ENGINE", "sqlite")
+os.environ.setdefault("SQLITE_PATH", ":memory:")
+os.environ.setdefault("SECRET_KEY", "bench-" + "x" * 32)
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from werkzeug.security import generate_password_hash
+from app import app
+from repositories import get_repos
+from compression import brotli
+
+ENDPOINTS = ["/answers", "/users", "/questions"]
+HEADERS = {"Origin": "http://localhost:3000"}
+
+
+def seed(users, questions, answers_per_user):
+    with app.app_context():
+        repos = get_repos()
+        repos.users.create({
+            "DNI": "bench", "name": "Bench", "lastname": "Admin", "email": "bench@example.com",
+            "password": generate_password_hash("bench"), "role": "admin"
+        })
+        unit_id = repos.units.create({"title": "Unidad de prueba", "level": 1})
+        q_ids = [
+            repos.questions.create({
+                "type": "OpenEntry", "body": f"Pregunta de prueba número {i}", "exp": 10,
+                "unit_id": unit_id, "expectedAnswer": f"respuesta {i}",
+                "hint1": {"text": "Primera ayuda", "penalty": 0.2},
+            })
+            for i in range(questions)
+        ]
+        for i in range(users):
+            u_id = repos.users.create({
+                "DNI": str(10000000 + i), "name": f"Nombre{i}", "lastname": f"Apellido{i}",
+                "email": f"alumno{i}@example.com", "role": "user", "exp": 0
+            })
+            for j in range(answers_per_user):
+                repos.answers.create({
+                    "user_id": u_id, "question_id": q_ids[j % len(q_ids)], "body": f"respuesta {j}"
+                })
+
+
+def decode(body, encoding):
+    if encoding == "gzip":
+        return gzip.decompress(body)
+    if encoding == "br":
+        return brotli.decompress(body)
+    return body
+
+
+def measure(client, path, headers, encoding, runs):
+    sizes, first_chunk, total = [], [], []
+    items = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        resp = client.get(path, headers=dict(headers, **{"Accept-Encoding": encoding}), buffered=False)
+        chunks = iter(resp.response)
+        body = next(chunks, b"")
+        first_chunk.append(time.perf_counter() - start)
+        body += b"".join(chunks)
+        total.append(time.perf_counter() - start)
+        resp.close()
+        sizes.append(len(body))
+        items = len(json.loads(decode(body, encoding)))
+    return {
+        "bytes": sizes[-1],
+        "items": items,
+        "ttfb_ms": statistics.median(first_chunk) * 1000,
+        "p50_ms": statistics.median(total) * 1000,
+        "p95_ms": sorted(total)[max(0, int(round(len(total) * 0.95)) - 1)] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de compresión de los listados grandes")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--answers-per-user", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    seed(args.users, args.questions, args.answers_per_user)
+    client = app.test_client()
+    token = client.post("/login", json={"DNI": "bench", "password": "bench"}, headers=HEADERS).json["access_token"]
+    headers = dict(HEADERS, Authorization=f"Bearer {token}")
+
+    encodings = ["identity", "gzip"] + (["br"] if brotli is not None else [])
+    print(f"{'endpoint':12} {'encoding':9} {'items':>7} {'bytes':>10} {'ratio':>6} "
+          f"{'ttfb ms':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for path in ENDPOINTS:
+        baseline = None
+        for encoding in encodings:
+            r = measure(client, path, headers, encoding, args.runs)
+            baseline = baseline or r["bytes"]
+            print(f"{path:12} {encoding:9} {r['items']:>7} {r['bytes']:>10} {r['bytes'] / baseline:>6.2f} "
+                  f"{r['ttfb_ms']:>8.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+# compaction.py
+# Compactación del historial de respuestas y archivo "frío" en disco.
+#
+# Cada intento viejo de `answers` se resume en `answer_summaries` (un documento
+# por usuario + pregunta) y el intento crudo se mueve a archivos .jsonl.gz
+# append-only, uno por mes de creación. La colección caliente queda chica y el
+# historial completo sigue disponible para auditorías con `read_archive`.
+#
+# Cada lote pasa por archivo -> resumen -> borrado y queda anotado en
+# `compaction_log` hasta terminar. Si una corrida se corta a mitad de un lote,
+# la siguiente lo retoma: no vuelve a archivar los intentos que ya están en
+# disco y el resumen no suma dos veces el mismo lote (ver summaries.fold).
+# Antes de borrar un lote se pasan al log los eventos que sus intentos tengan
+# pendientes (ver events.py): si no se puede, el lote queda para la próxima.
+
+import os
+import glob
+import gzip
+from datetime import datetime, timedelta
+from bson import ObjectId, json_util
+from flask import current_app
+from repositories import get_repos
+from utils import is_answer_correct, net_exp
+from events import relay_pending
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+DEFAULT_ARCHIVE_DIR = os.path.join(BASE_DIR, 'archive')
+BATCH_SIZE = 1000
+LOG_NAME = "answers"
+
+
+def archive_dir():
+    path = current_app.config.get("ANSWERS_ARCHIVE_DIR") or DEFAULT_ARCHIVE_DIR
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _archive_file(directory, created_at):
+    return os.path.join(directory, f"answers-{created_at:%Y-%m}.jsonl.gz")
+
+
+def _archived_ids(directory, batch):
+    """Ids del lote que ya están en los archivos de sus meses."""
+    wanted = {ans["_id"] for ans in batch}
+    found = set()
+    paths = {_archive_file(directory, ans["_id"].generation_time) for ans in batch}
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with gzip.open(path, "rt", encoding="utf-8") as fh:
+            for line in fh:
+                if line.strip():
+                    ans_id = json_util.loads(line)["_id"]
+                    if ans_id in wanted:
+                        found.add(ans_id)
+    return found
+
+
+def _write_archive(directory, batch, skip_ids=()):
+    """Agrega los intentos al archivo del mes correspondiente (nuevo miembro gzip)."""
+    by_file = {}
+    now = datetime.utcnow()
+    for ans in batch:
+        if ans["_id"] in skip_ids:
+            continue
+        created_at = ans["_id"].generation_time.replace(tzinfo=None)
+        doc = dict(ans, archivedAt=now)
+        by_file.setdefault(_archive_file(directory, created_at), []).append(
+            json_util.dumps(doc)
+        )
+    for path, lines in by_file.items():
+        with gzip.open(path, "at", encoding="utf-8") as fh:
+            fh.write("\n".join(lines) + "\n")
+
+
+def _fold_batch(repos, batch, questions, batch_id):
+    """Suma los intentos del lote en `answer_summaries` (upsert por usuario + pregunta)."""
+    folded = {}
+    for ans in batch:
+        key = (ans["user_id"], ans["question_id"])
+        s = folded.setdefault(key, {
+            "attempts": 0, "correctAttempts": 0, "expAwarded": 0,
+            "firstCorrectAt": None, "firstAttemptAt": None, "lastAttemptAt": None,
+            "course_id": ans.get("course_id"),
+        })
+        created_at = ans["_id"].generation_time.replace(tzinfo=None)
+        s["attempts"] += 1
+        s["firstAttemptAt"] = min(filter(None, [s["firstAttemptAt"], created_at]))
+        s["lastAttemptAt"] = max(filter(None, [s["lastAttemptAt"], created_at]))
+
+        q = questions.get(ans["question_id"])
+        if not q or not is_answer_correct(q, ans):
+            continue
+        help_doc = repos.helps.get_for(ans["user_id"], ans["question_id"])
+        s["correctAttempts"] += 1
+        s["expAwarded"] += net_exp(q, help_doc)
+        s["firstCorrectAt"] = min(filter(None, [s["firstCorrectAt"], created_at]))
+
+    now = datetime.utcnow()
+    for (u_id, q_id), s in folded.items():
+        repos.summaries.fold(
+            u_id, q_id, s["attempts"], s["correctAttempts"], s["expAwarded"],
+            s["firstAttemptAt"], s["lastAttemptAt"], s["firstCorrectAt"], now,
+            course_id=s["course_id"], batch_id=batch_id
+        )
+
+
+def compact_answers(before=None, max_age_days=None, directory=None):
+    """
+    Mueve al archivo los intentos creados antes de `before` (o con más de
+    `max_age_days` días) y los resume en `answer_summaries`.
+    Por cada lote: primero se escribe el archivo, después el resumen y recién
+    entonces se borran los intentos de la colección caliente. Si quedó un lote
+    a medias de una corrida anterior, se termina antes de tomar uno nuevo.
+    Devuelve la cantidad de intentos compactados.
+    """
+    if before is None:
+        if max_age_days is None:
+            raise ValueError("Indicar 'before' o 'max_age_days'")
+        before = datetime.utcnow() - timedelta(days=int(max_age_days))
+    directory = directory or archive_dir()
+    repos = get_repos("primary")
+    # Sin el índice único, reaplicar un lote duplicaría resúmenes (ver summaries.fold)
+    repos.summaries.ensure_index()
+
+    questions = {q["_id"]: q for q in repos.questions.all()}
+    # La fecha de creación va codificada en el _id, así que el filtro usa su índice
+    before_id = ObjectId.from_datetime(before)
+
+    total = 0
+    pending = repos.compactions.get(LOG_NAME)
+    if pending:
+        total += _apply_batch(repos, directory, questions, pending)
+    while True:
+        batch = repos.answers.created_before(before_id, BATCH_SIZE)
+        if not batch:
+            break
+        entry = {"batch": str(ObjectId()), "ids": [a["_id"] for a in batch], "stage": "archive"}
+        repos.compactions.set(LOG_NAME, entry)
+        total += _apply_batch(repos, directory, questions, entry, batch)
+    return total
+
+
+def _apply_batch(repos, directory, questions, entry, batch=None):
+    """
+    Archiva, resume y borra un lote anotado en `compaction_log`, avanzando
+    `stage` a medida que termina cada paso.
+    """
+    resumed = batch is None
+    if resumed:
+        # Lote retomado: los intentos que siguen en la colección caliente
+        batch = list(repos.answers.by_ids(entry["ids"]))
+    if entry["stage"] == "archive":
+        # Si la corrida anterior se cortó escribiendo, parte del lote ya está en disco
+        skip = _archived_ids(directory, batch) if resumed else set()
+        _write_archive(directory, batch, skip)
+        entry["stage"] = "fold"
+        repos.compactions.set(LOG_NAME, {"stage": "fold"})
+    if entry["stage"] == "fold":
+        _fold_batch(repos, batch, questions, entry["batch"])
+        repos.compactions.set(LOG_NAME, {"stage": "delete"})
+    relay_pending(repos, len(entry["ids"]), entry["ids"], sources=("answers",))
+    if repos.answers.with_pending(1, entry["ids"]):
+        raise RuntimeError("Quedan eventos sin pasar al log; el lote se retoma en la próxima corrida")
+    repos.answers.delete_many(entry["ids"])
+    repos.compactions.delete(LOG_NAME)
+    return len(batch)
+
+
+def read_archive(user_id=None, question_id=None, since=None, until=None, directory=None):
+    """
+    Generador de auditoría: recorre los intentos archivados (en orden de
+    creación) filtrando opcionalmente por usuario, pregunta y rango de fechas.
+    """
+    directory = directory or archive_dir()
+    for path in sorted(glob.glob(os.path.join(directory, "answers-*.jsonl.gz"))):
+        month = datetime.strptime(os.path.basename(path)[8:15], "%Y-%m")
+        if until and month > until:
+            continue
+        with gzip.open(path, "rt", encoding="utf-8") as fh:
+            for line in fh:
+                if not line.strip():
+                    continue
+                ans = json_util.loads(line)
+                if user_id and ans.get("user_id") != user_id:
+                    continue
+                if question_id and ans.get("question_id") != question_id:
+                    continue
+                created_at = ans["_id"].generation_time.replace(tzinfo=None)
+                if since and created_at < since:
+                    continue
+                if until and created_at >= until:
+                    continue
+                yield ans
@@ -0,0 +1,131 @@
+# compression.py
+# Compresión negociada (Brotli / gzip) de las respuestas y streaming de
+# arrays JSON grandes.
+#
+# Las respuestas armadas en memoria se comprimen si superan
+# COMPRESSION_MIN_SIZE bytes. Las respuestas en streaming (stream_json_array)
+# se comprimen siempre, sin importar su tamaño: no se conoce hasta terminar de
+# generarlas. Se comprimen de a bloques, sin juntar todo el array.
+# Brotli es opcional: si el paquete no está instalado solo se ofrece gzip.
+
+import zlib
+from flask import current_app, request, stream_with_context
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {"application/json", "text/html", "text/plain", "text/csv"}
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def init_compression(app):
+    app.config.setdefault("COMPRESSION_MIN_SIZE", 1024)
+    app.config.setdefault("COMPRESSION_GZIP_LEVEL", 6)
+    app.config.setdefault("COMPRESSION_BR_LEVEL", 5)
+    app.after_request(compress_response)
+
+
+def _accepted_encodings():
+    """Codificaciones aceptadas por el cliente (con q > 0)."""
+    accepted = set()
+    for part in request.headers.get("Accept-Encoding", "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if name and q > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def choose_encoding():
+    accepted = _accepted_encodings()
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def _compressor(encoding):
+    cfg = current_app.config
+    if encoding == "br":
+        c = brotli.Compressor(quality=cfg["COMPRESSION_BR_LEVEL"])
+        return c.process, c.finish
+    # wbits=31 -> formato gzip (cabecera + CRC)
+    c = zlib.compressobj(cfg["COMPRESSION_GZIP_LEVEL"], zlib.DEFLATED, 31)
+    return c.compress, c.flush
+
+
+def _compress_stream(chunks, encoding):
+    compress, finish = _compressor(encoding)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        out = compress(chunk)
+        if out:
+            yield out
+    yield finish()
+
+
+def compress_response(response):
+    if (
+        response.status_code < 200
+        or response.status_code in (204, 304)
+        or response.direct_passthrough
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = choose_encoding()
+    if not encoding:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, encoding)
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < current_app.config["COMPRESSION_MIN_SIZE"]:
+            return response
+        compress, finish = _compressor(encoding)
+        response.set_data(compress(data) + finish())
+
+    response.headers["Content-Encoding"] = encoding
+    # El cuerpo ya no es byte a byte el original: el ETag pasa a ser débil
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def stream_json_array(items):
+    """
+    Respuesta JSON en streaming: serializa `items` de a uno y emite bloques de
+    ~64 KB, así el array completo nunca está armado en memoria.
+    """
+    dumps = current_app.json.dumps
+
+    def generate():
+        buf = ["["]
+        size = 1
+        first = True
+        for item in items:
+            part = dumps(item) if first else "," + dumps(item)
+            first = False
+            buf.append(part)
+            size += len(part)
+            if size >= STREAM_CHUNK_SIZE:
+                yield "".join(buf)
+                buf, size = [], 0
+        buf.append("]\n")
+        yield "".join(buf)
+
+    return current_app.response_class(stream_with_context(generate()), mimetype="application/json")
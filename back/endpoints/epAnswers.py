@@ -1,7 +1,12 @@
 from flask import Blueprint, request, jsonify
 from bson import ObjectId
-from extensions import mongo
+from repositories import get_repos
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from datetime import datetime
+from utils import roles_required, current_course
+from compaction import read_archive
+from compression import stream_json_array
+from events import answer_events, relay
 
 answers_bp = Blueprint('answers', __name__)
 
@@ -34,22 +39,14 @@ def create_answer():
     except:
         return jsonify({"error": "ID inválido"}), 400
 
-    # 3) Inserto el registro de la respuesta
-    answer_doc = {"question_id": q_obj, "user_id": u_obj}
-    if body is not None:
-        answer_doc["body"] = body
-    else:
-        answer_doc["selectedOption"] = selected
-
-    ins = mongo.db.answers.insert_one(answer_doc)
-
-    # 4) Determino si la respuesta es correcta
-    q = mongo.db.questions.find_one({"_id": q_obj})
-    is_correct = False
+    repos = get_repos()
+    q = repos.questions.get(q_obj)
     if not q:
-        # (en principio no debería pasar)
         return jsonify({"error": "Pregunta no encontrada"}), 404
 
+    # 3) Determino si la respuesta es correcta
+    is_correct = False
+
     if body is not None:
         # comparación case-insensitive
         is_correct = (body.strip().lower() == q.get("expectedAnswer", "").strip().lower())
@@ -63,12 +60,9 @@ def create_answer():
     exp_awarded = 0
 
     if is_correct:
-        # 5) Calculo penalizaciones
+        # 4) Calculo penalizaciones
         base_exp = q.get("exp", 0)
-        help_doc = mongo.db.question_helps.find_one({
-            "user_id": u_obj,
-            "question_id": q_obj
-        }) or {}
+        help_doc = repos.helps.get_for(u_obj, q_obj) or {}
 
         total_penalty = 0.0
         if help_doc.get("usedHelp1"):
@@ -80,15 +74,31 @@ def create_answer():
         # exp neta
         exp_awarded = int(base_exp * (1 - total_penalty))
 
-        # 6) Actualizo la exp del usuario
-        mongo.db.users.update_one(
-            {"_id": u_obj},
-            {"$inc": {"exp": exp_awarded}}
-        )
+    # 5) Inserto la respuesta (con el curso de la pregunta) junto con sus
+    #    eventos pendientes, en una sola escritura (ver events.py)
+    answer_id = ObjectId()
+    answer_doc = {"_id": answer_id, "question_id": q_obj, "user_id": u_obj}
+    if q.get("course_id"):
+        answer_doc["course_id"] = q["course_id"]
+    if body is not None:
+        answer_doc["body"] = body
+    else:
+        answer_doc["selectedOption"] = selected
+    events = answer_events(answer_id, u_obj, q, is_correct, exp_awarded, datetime.utcnow())
+    answer_doc["pendingEvents"] = events
 
-    # 7) Respondo al cliente
+    repos.answers.create(answer_doc)
+
+    # 6) Actualizo la exp del usuario
+    if is_correct:
+        repos.users.add_exp(u_obj, exp_awarded)
+
+    # 7) Paso los eventos al log de GET /events
+    relay(repos, "answers", answer_id, events)
+
+    # 8) Respondo al cliente
     return jsonify({
-        "answer_id": str(ins.inserted_id),
+        "answer_id": str(answer_id),
         "correct": is_correct,
         "expAwarded": exp_awarded
     }), 201
@@ -101,8 +111,9 @@ def get_answers():
     Se pueden filtrar opcionalmente por:
       - question_id: mediante un parámetro de consulta.
       - user_id: mediante un parámetro de consulta.
+    Con un curso seleccionado solo se devuelven las respuestas de ese curso.
     """
-    query = {}
+    query = {"course_id": current_course()}
     question_id = request.args.get("question_id")
     user_id = request.args.get("user_id")
 
@@ -118,9 +129,40 @@ def get_answers():
         except Exception:
             return jsonify({"error": "user_id inválido"}), 400
 
-    cursor = mongo.db.answers.find(query)
+    def serialize(ans):
+        ans["_id"] = str(ans["_id"])
+        ans["question_id"] = str(ans["question_id"])
+        ans["user_id"] = str(ans["user_id"])
+        return ans
+
+    cursor = get_repos().answers.find(**query)
+    return stream_json_array(serialize(ans) for ans in cursor)
+
+@answers_bp.route('/answers/archive', methods=['GET'])
+@roles_required("admin", "docente")
+def get_archived_answers():
+    """
+    Auditoría: devuelve los intentos movidos al archivo en disco.
+    Filtros opcionales por query string:
+      - user_id, question_id
+      - since, until: fechas ISO (por ej. 2025-03-01)
+    """
+    filters = {}
+    for key in ("user_id", "question_id"):
+        if request.args.get(key):
+            try:
+                filters[key] = ObjectId(request.args[key])
+            except Exception:
+                return jsonify({"error": f"{key} inválido"}), 400
+    for key in ("since", "until"):
+        if request.args.get(key):
+            try:
+                filters[key] = datetime.fromisoformat(request.args[key])
+            except ValueError:
+                return jsonify({"error": f"{key} inválido"}), 400
+
     answers = []
-    for ans in cursor:
+    for ans in read_archive(**filters):
         ans["_id"] = str(ans["_id"])
         ans["question_id"] = str(ans["question_id"])
         ans["user_id"] = str(ans["user_id"])
@@ -137,7 +179,7 @@ def get_answer(answer_id):
     except Exception:
         return jsonify({"error": "answer_id inválido"}), 400
 
-    answer = mongo.db.answers.find_one({"_id": ans_id})
+    answer = get_repos().answers.get(ans_id)
     if not answer:
         return jsonify({"error": "Respuesta no encontrada"}), 404
 
@@ -156,7 +198,6 @@ def delete_answer(answer_id):
     except Exception:
         return jsonify({"error": "answer_id inválido"}), 400
 
-    result = mongo.db.answers.delete_one({"_id": ans_id})
-    if result.deleted_count == 0:
+    if not get_repos().answers.delete(ans_id):
         return jsonify({"error": "Respuesta no encontrada"}), 404
     return jsonify({"message": "Respuesta eliminada exitosamente"}), 200
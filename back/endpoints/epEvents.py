@@ -0,0 +1,60 @@
+# Lectura del log de eventos de respuestas (ver events.py).
+from flask import Blueprint, request, jsonify
+from repositories import get_repos
+from utils import roles_required, current_course
+from events import EVENT_TYPES, encode_cursor, decode_cursor, read_events
+
+events_bp = Blueprint('events', __name__)
+
+MAX_LIMIT = 1000
+
+def serialize_event(ev):
+    ev = dict(ev)
+    ev["seq"] = ev.pop("_id")
+    for key in ("user_id", "question_id", "answer_id"):
+        if key in ev:
+            ev[key] = str(ev[key])
+    return ev
+
+@events_bp.route('/events', methods=['GET'])
+@roles_required("admin", "docente")
+def get_events():
+    """
+    Devuelve eventos en orden a partir de un cursor. Parámetros opcionales:
+      - cursor: el "cursor" de la respuesta anterior (sin cursor, desde el principio)
+      - from=latest: empezar desde ahora, sin leer el historial
+      - limit: cantidad máxima de eventos (por defecto 100, hasta 1000)
+      - types: tipos separados por coma (answer_graded, exp_awarded, hint_used)
+    Con un curso seleccionado solo se devuelven los eventos de ese curso.
+    Responde { events, cursor, hasMore }: se guarda `cursor` y se pide de
+    nuevo, enseguida si hasMore es true o después de un rato si no.
+    """
+    repos = get_repos()
+    try:
+        limit = min(max(int(request.args.get("limit", 100)), 1), MAX_LIMIT)
+    except ValueError:
+        return jsonify({"error": "limit inválido"}), 400
+
+    types = None
+    if request.args.get("types"):
+        types = request.args["types"].split(",")
+        unknown = [t for t in types if t not in EVENT_TYPES]
+        if unknown:
+            return jsonify({"error": f"Tipo de evento desconocido: {', '.join(unknown)}"}), 400
+
+    if request.args.get("cursor"):
+        try:
+            after = decode_cursor(request.args["cursor"])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+    elif request.args.get("from") == "latest":
+        after = repos.events.last_seq()
+    else:
+        after = 0
+
+    events, last, has_more = read_events(repos, after, limit, types, current_course())
+    return jsonify({
+        "events": [serialize_event(ev) for ev in events],
+        "cursor": encode_cursor(last),
+        "hasMore": has_more,
+    }), 200
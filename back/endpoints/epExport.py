@@ -0,0 +1,52 @@
+# Endpoints de exportación para análisis (solo admin).
+# Las corridas escriben Parquet en EXPORT_DIR; los analistas descargan los
+# archivos y consultan offline sin tocar la base de producción.
+import os
+from flask import Blueprint, request, jsonify, send_from_directory
+from utils import roles_required
+from export import export_all, export_dir, COLLECTIONS
+
+export_bp = Blueprint('export', __name__)
+
+@export_bp.route('/export', methods=['POST'])
+@roles_required("admin")
+def run_export():
+    """
+    Lanza una exportación. JSON opcional:
+      - collections: lista (por defecto answers, question_helps, questions, users)
+      - incremental: bool (por defecto true, desde la última marca de agua)
+    """
+    data = request.get_json(silent=True) or {}
+    collections = data.get("collections") or list(COLLECTIONS)
+    invalid = [c for c in collections if c not in COLLECTIONS]
+    if invalid:
+        return jsonify({"error": f"Colecciones no exportables: {', '.join(invalid)}"}), 400
+
+    try:
+        result = export_all(collections, incremental=bool(data.get("incremental", True)))
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify(result), 200
+
+@export_bp.route('/export/files', methods=['GET'])
+@roles_required("admin")
+def list_export_files():
+    base = export_dir()
+    files = []
+    for name in COLLECTIONS:
+        folder = os.path.join(base, name)
+        if not os.path.isdir(folder):
+            continue
+        for filename in sorted(os.listdir(folder)):
+            files.append({
+                "path": f"{name}/{filename}",
+                "size": os.path.getsize(os.path.join(folder, filename))
+            })
+    return jsonify(files), 200
+
+@export_bp.route('/export/files/<collection>/<filename>', methods=['GET'])
+@roles_required("admin")
+def download_export_file(collection, filename):
+    if collection not in COLLECTIONS:
+        return jsonify({"error": "Colección inválida"}), 400
+    return send_from_directory(os.path.join(export_dir(), collection), filename, as_attachment=True)
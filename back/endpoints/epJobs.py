@@ -0,0 +1,34 @@
+# Estado y disparo manual de los jobs en segundo plano (solo admin).
+from datetime import datetime
+from flask import Blueprint, jsonify
+from repositories import get_repos
+from utils import roles_required
+from jobs import JOBS
+
+jobs_bp = Blueprint('jobs', __name__)
+
+def serialize_job(doc):
+    doc = dict(doc)
+    doc["name"] = doc.pop("_id")
+    return doc
+
+@jobs_bp.route('/jobs', methods=['GET'])
+@roles_required("admin")
+def get_jobs():
+    return jsonify([serialize_job(j) for j in get_repos().jobs.all()]), 200
+
+@jobs_bp.route('/jobs/<name>', methods=['GET'])
+@roles_required("admin")
+def get_job(name):
+    doc = get_repos().jobs.get(name)
+    if not doc:
+        return jsonify({"error": "Job no encontrado"}), 404
+    return jsonify(serialize_job(doc)), 200
+
+@jobs_bp.route('/jobs/<name>/run', methods=['POST'])
+@roles_required("admin")
+def run_job(name):
+    """Adelanta la próxima corrida del job a ahora; la toma el próximo ciclo del scheduler."""
+    if name not in JOBS or not get_repos().jobs.request_run(name, datetime.utcnow()):
+        return jsonify({"error": "Job no encontrado"}), 404
+    return jsonify({"message": "Job encolado"}), 202
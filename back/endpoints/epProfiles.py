@@ -0,0 +1,33 @@
+# Listado y descarga de los profiles capturados por profiling.py (solo admin).
+import os
+from flask import Blueprint, jsonify, send_from_directory
+from utils import roles_required
+from profiling import profile_dir
+
+profiles_bp = Blueprint('profiles', __name__)
+
+@profiles_bp.route('/profiles', methods=['GET'])
+@roles_required("admin")
+def list_profiles():
+    """Profiles guardados, del más nuevo al más viejo."""
+    directory = profile_dir()
+    files = []
+    for filename in sorted(os.listdir(directory), reverse=True):
+        if not filename.endswith(".collapsed"):
+            continue
+        # <fecha>-<endpoint>-<duración>ms.collapsed
+        stamp, _, rest = filename[:-len(".collapsed")].partition("-")
+        endpoint, _, duration = rest.rpartition("-")
+        files.append({
+            "filename": filename,
+            "endpoint": endpoint,
+            "durationMs": int(duration[:-2]) if duration.endswith("ms") and duration[:-2].isdigit() else None,
+            "capturedAt": stamp,
+            "size": os.path.getsize(os.path.join(directory, filename))
+        })
+    return jsonify(files), 200
+
+@profiles_bp.route('/profiles/<filename>', methods=['GET'])
+@roles_required("admin")
+def download_profile(filename):
+    return send_from_directory(profile_dir(), filename, as_attachment=True, mimetype="text/plain")
@@ -6,8 +6,11 @@ from flask_jwt_extended import jwt_required
 from flask_cors import CORS, cross_origin
 from werkzeug.utils import secure_filename
 from bson import ObjectId
-from extensions import mongo
+from repositories import get_repos
 from datetime import datetime
+from utils import help_status, current_course, require_course
+from compression import stream_json_array
+from events import hint_events, relay_hints
 
 questions_bp = Blueprint('questions', __name__)
 # Habilita CORS y OPTIONS en todas las rutas de este blueprint 
@@ -47,6 +50,11 @@ def create_question():
     if data.get("imagePath"):
         question["imagePath"] = data["imagePath"]
 
+    # La pregunta hereda el curso de su unidad
+    unit = get_repos().units.get(unit_id)
+    if unit and unit.get("course_id"):
+        question["course_id"] = unit["course_id"]
+
     # Campos específicos según tipo de pregunta
     if data["type"] == "Choice":
         if "options" not in data or not isinstance(data["options"], list):
@@ -72,27 +80,31 @@ def create_question():
 
 
 
-    res = mongo.db.questions.insert_one(question)
-    return jsonify({"message": "Pregunta creada", "question_id": str(res.inserted_id)}), 201
+    question_id = get_repos().questions.create(question)
+    return jsonify({"message": "Pregunta creada", "question_id": str(question_id)}), 201
 
 @questions_bp.route('/questions', methods=['GET'])
 ##@jwt_required()
 @cross_origin()
 def get_questions():
-    query = {}
+    repos = get_repos()
     uid = request.args.get('unit_id')
     if uid:
         try:
-            query['unit_id'] = ObjectId(uid)
+            unit_obj = ObjectId(uid)
         except:
             return jsonify({"error":"unit_id inválido"}), 400
-    out = []
-    for q in mongo.db.questions.find(query):
+        unit = repos.units.get(unit_obj)
+        if unit:
+            require_course(unit.get("course_id"))
+        questions = repos.questions.by_unit(unit_obj)
+    else:
+        questions = repos.questions.all(current_course())
+    def serialize(q):
         q['_id'], q['unit_id'] = str(q['_id']), str(q['unit_id'])
-        if "imagePath" in q:
-            q['imagePath'] = q['imagePath']
-        out.append(q)
-    return jsonify(out), 200
+        return q
+
+    return stream_json_array(serialize(q) for q in questions)
 
 @questions_bp.route('/questions/<question_id>', methods=['GET'])
 ##@jwt_required()
@@ -102,7 +114,7 @@ def get_question(question_id):
         q_id = ObjectId(question_id)
     except:
         return jsonify({"error":"question_id inválido"}), 400
-    q = mongo.db.questions.find_one({"_id": q_id})
+    q = get_repos().questions.get(q_id)
     if not q:
         return jsonify({"error":"Pregunta no encontrada"}), 404
     q['_id'], q['unit_id'] = str(q['_id']), str(q['unit_id'])
@@ -138,17 +150,18 @@ def update_question(question_id):
     if "unit_id" in data:
         try:
             nu = ObjectId(data["unit_id"])
-            if not mongo.db.units.find_one({"_id":nu}):
+            unit = get_repos().units.get(nu)
+            if not unit:
                 return jsonify({"error":"Unidad no existe"}), 400
             updates["unit_id"] = nu
+            updates["course_id"] = unit.get("course_id")
         except:
             return jsonify({"error":"unit_id inválido"}), 400
 
     if not updates:
         return jsonify({"error":"Nada que actualizar"}), 400
 
-    res = mongo.db.questions.update_one({"_id":q_id}, {"$set":updates})
-    if res.matched_count == 0:
+    if not get_repos().questions.update(q_id, updates):
         return jsonify({"error":"Pregunta no encontrada"}), 404
     return jsonify({"message":"Actualizada exitosamente"}), 200
 
@@ -159,8 +172,7 @@ def delete_question(question_id):
         q_id = ObjectId(question_id)
     except:
         return jsonify({"error":"question_id inválido"}), 400
-    res = mongo.db.questions.delete_one({"_id":q_id})
-    if res.deleted_count == 0:
+    if not get_repos().questions.delete(q_id):
         return jsonify({"error":"Pregunta no encontrada"}), 404
     return jsonify({"message":"Eliminada exitosamente"}), 200
 
@@ -181,10 +193,7 @@ def upload_question_image(id):
     filename = secure_filename(file.filename)  # sanitiza nombre :contentReference[oaicite:5]{index=5}
     file.save(os.path.join(UPLOAD_FOLDER, filename))
 
-    mongo.db.questions.update_one(
-        {"_id": ObjectId(id)},
-        {"$set": {"imagePath": filename}}
-    )
+    get_repos().questions.update(ObjectId(id), {"imagePath": filename})
 
     public_url = url_for('static', filename=f'../img/{filename}', _external=True)
     return jsonify({"imageUrl": public_url}), 200
@@ -211,16 +220,16 @@ def use_help(question_id):
     h = data["helpNumber"]     # 1 o 2
 
     hint_key = f"hint{h}"
-    q = mongo.db.questions.find_one({"_id": ObjectId(question_id)})
+    repos = get_repos()
+    q = repos.questions.get(ObjectId(question_id))
     if not q or hint_key not in q:
         return jsonify({"error":"No existe esa ayuda"}), 400
 
-    # Registra el uso (upsert)
-    mongo.db.question_helps.update_one(
-        {"user_id":u_id, "question_id":q["_id"]},
-        {"$set": {f"usedHelp{h}": True, "timestamp": datetime.utcnow()}},
-        upsert=True
-    )
+    # Registra el uso (upsert) junto con su evento pendiente
+    now = datetime.utcnow()
+    events = hint_events(u_id, [(q["_id"], h)], {q["_id"]: q}, now)
+    updated = repos.helps.mark_used(u_id, [(q["_id"], h)], now, events)
+    relay_hints(repos, updated, events)
 
     return jsonify({
       "text": q[hint_key]["text"],
@@ -244,12 +253,78 @@ def get_help_status(question_id):
     except:
         return jsonify({"error":"ID inválido"}), 400
 
-    help_doc = mongo.db.question_helps.find_one({
-        "user_id": u_obj,
-        "question_id": q_obj
-    }) or {}
+    help_doc = get_repos().helps.get_for(u_obj, q_obj)
+
+    return jsonify(help_status(help_doc)), 200
+
+@questions_bp.route('/units/<unit_id>/help-status', methods=['GET'])
+@cross_origin()
+def get_unit_help_status(unit_id):
+    """
+    Estado de hints de todas las preguntas de una unidad para un usuario:
+    { question_id: { usedHelp1: bool, usedHelp2: bool }, ... }
+    Parámetro en query string: ?user_id=...
+    """
+    user_id = request.args.get("user_id")
+    if not user_id:
+        return jsonify({"error":"Falta user_id"}), 400
+
+    try:
+        u_obj = ObjectId(user_id)
+        unit_obj = ObjectId(unit_id)
+    except:
+        return jsonify({"error":"ID inválido"}), 400
+
+    repos = get_repos()
+    unit = repos.units.get(unit_obj)
+    if unit:
+        require_course(unit.get("course_id"))
+    q_ids = repos.questions.ids_by_unit(unit_obj)
+    # Una sola consulta sobre el índice (user_id, question_id)
+    helps = {h["question_id"]: h for h in repos.helps.for_user(u_obj, q_ids)}
+    return jsonify({str(q_id): help_status(helps.get(q_id)) for q_id in q_ids}), 200
+
+@questions_bp.route('/questions/help', methods=['POST'])
+@cross_origin()
+def use_helps_batch():
+    """
+    Versión por lotes de use_help. Se espera un JSON con:
+      - user_id (string)
+      - helps: [{ question_id, helpNumber }, ...]
+    Devuelve, por pregunta, el texto y la penalización de los hints pedidos y
+    el estado que dejó su escritura. Cada pregunta se registra con una sola
+    escritura atómica (todos sus hints juntos), pero el lote no es una
+    transacción: si falla a mitad, las preguntas ya escritas quedan registradas
+    y reenviar el mismo pedido es seguro (marcar un hint es idempotente).
+    """
+    data = request.get_json() or {}
+    helps = data.get("helps")
+    if not data.get("user_id") or not isinstance(helps, list) or not helps:
+        return jsonify({"error":"Faltan user_id o helps"}), 400
+
+    try:
+        u_obj = ObjectId(data["user_id"])
+        requested = [(ObjectId(h["question_id"]), int(h["helpNumber"])) for h in helps]
+    except:
+        return jsonify({"error":"ID o helpNumber inválido"}), 400
+
+    q_ids = list({q_id for q_id, _ in requested})
+    repos = get_repos()
+    questions = {q["_id"]: q for q in repos.questions.by_ids(q_ids)}
+    for q_id, h in requested:
+        q = questions.get(q_id)
+        if h not in (1, 2) or not q or f"hint{h}" not in q:
+            return jsonify({"error": f"No existe la ayuda {h} de la pregunta {q_id}"}), 400
+
+    now = datetime.utcnow()
+    events = hint_events(u_obj, requested, questions, now)
+    updated = repos.helps.mark_used(u_obj, requested, now, events)
+    relay_hints(repos, updated, events)
+
+    out = {}
+    for q_id, h in requested:
+        entry = out.setdefault(str(q_id), {"hints": {}, **help_status(updated[q_id])})
+        hint = questions[q_id][f"hint{h}"]
+        entry["hints"][str(h)] = {"text": hint["text"], "penalty": hint["penalty"]}
+    return jsonify(out), 200
 
-    return jsonify({
-        "usedHelp1": bool(help_doc.get("usedHelp1", False)),
-        "usedHelp2": bool(help_doc.get("usedHelp2", False))
-    }), 200
@@ -3,15 +3,16 @@
 # matematicas, geografia, etc.
 from flask import Blueprint, request, jsonify
 from bson import ObjectId
-from extensions import mongo
+from repositories import get_repos
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from utils import is_answer_correct, net_exp, help_status, current_course, require_course
 
 units_bp = Blueprint('units', __name__)
 
 @units_bp.route('/units', methods=['GET'])
 ##@jwt_required()
 def get_units():
-    units_cursor = mongo.db.units.find()
+    units_cursor = get_repos().units.all(current_course())
     units_list = []
     for unit in units_cursor:
         unit['_id'] = str(unit['_id'])
@@ -27,14 +28,18 @@ def create_unit():
     if not title or level is None:
         return jsonify({"error": "Faltan datos"}), 400
 
-    result = mongo.db.units.insert_one({
+    unit = {
         "title": title,
         "level": level
-    })
+    }
+    course_id = data.get("course_id") or current_course()
+    if course_id:
+        unit["course_id"] = course_id
+    unit_id = get_repos().units.create(unit)
 
     return jsonify({
         "message": "Unidad creada exitosamente",
-        "unit_id": str(result.inserted_id)
+        "unit_id": str(unit_id)
     }), 201
 
 @units_bp.route('/units/<unit_id>', methods=['PUT'])
@@ -50,21 +55,14 @@ def update_unit(unit_id):
     if not update_data:
         return jsonify({"error": "No hay datos para actualizar"}), 400
 
-    result = mongo.db.units.update_one(
-        {"_id": ObjectId(unit_id)},
-        {"$set": update_data}
-    )
-
-    if result.matched_count == 0:
+    if not get_repos().units.update(ObjectId(unit_id), update_data):
         return jsonify({"error": "Unidad no encontrada"}), 404
 
     return jsonify({"message": "Unidad actualizada exitosamente"}), 200
 
 @units_bp.route('/units/<unit_id>', methods=['DELETE'])
 def delete_unit(unit_id):
-    result = mongo.db.units.delete_one({"_id": ObjectId(unit_id)})
-    
-    if result.deleted_count == 0:
+    if not get_repos().units.delete(ObjectId(unit_id)):
         return jsonify({"error": "Unidad no encontrada"}), 404
 
     return jsonify({"message": "Unidad eliminada exitosamente"}), 200
@@ -75,10 +73,87 @@ def get_unit_by_id(unit_id):
     except Exception:
         return jsonify({"error": "ID inválido"}), 400
 
-    unit = mongo.db.units.find_one({"_id": obj_id})
+    unit = get_repos().units.get(obj_id)
     if not unit:
         return jsonify({"error": "Unidad no encontrada"}), 404
+    require_course(unit.get("course_id"))
 
     # convertir ObjectId a string
     unit['_id'] = str(unit['_id'])
-    return jsonify(unit), 200
\ No newline at end of file
+    return jsonify(unit), 200
+
+@units_bp.route('/units/<unit_id>/dashboard', methods=['GET'])
+@jwt_required()
+def get_unit_dashboard(unit_id):
+    """
+    Arma en una sola respuesta todo lo que necesita la pantalla de una unidad
+    para el usuario del JWT:
+      - unit: la unidad
+      - questions: sus preguntas sin la respuesta: sin expectedAnswer, las
+        opciones solo con su body y los hints solo con su penalty (el texto
+        se pide con /questions/<id>/help, que registra el uso)
+      - solved: ids de las preguntas ya resueltas
+      - helpStatus: { question_id: { usedHelp1, usedHelp2 } }
+      - exp: exp obtenida en la unidad
+    Soporta GET condicional (ETag / If-None-Match).
+    """
+    try:
+        unit_obj = ObjectId(unit_id)
+    except Exception:
+        return jsonify({"error": "ID inválido"}), 400
+
+    repos = get_repos()
+    unit = repos.units.get(unit_obj)
+    if not unit:
+        return jsonify({"error": "Unidad no encontrada"}), 404
+    require_course(unit.get("course_id"))
+    user = repos.users.by_dni(get_jwt_identity(), {"_id": 1})
+    if not user:
+        return jsonify({"error": "Usuario no encontrado"}), 404
+    u_obj = user["_id"]
+
+    questions = list(repos.questions.by_unit(unit_obj))
+    by_id = {q["_id"]: q for q in questions}
+    q_ids = list(by_id)
+
+    helps = {
+        h["question_id"]: h
+        for h in repos.helps.for_user(u_obj, q_ids)
+    }
+
+    solved = set()
+    total_exp = 0
+    for summary in repos.summaries.for_user(u_obj):
+        if summary["question_id"] in by_id:
+            total_exp += summary.get("expAwarded", 0)
+            if summary.get("correctAttempts", 0) > 0:
+                solved.add(summary["question_id"])
+    for ans in repos.answers.find(user_id=u_obj, question_ids=q_ids):
+        q = by_id[ans["question_id"]]
+        if is_answer_correct(q, ans):
+            solved.add(q["_id"])
+            total_exp += net_exp(q, helps.get(q["_id"]))
+
+    question_list = []
+    for q in questions:
+        q.pop("expectedAnswer", None)
+        if "options" in q:
+            q["options"] = [{"body": opt.get("body")} for opt in q["options"]]
+        for hint_key in ("hint1", "hint2"):
+            if hint_key in q:
+                q[hint_key] = {"penalty": q[hint_key].get("penalty", 0)}
+        q['_id'], q['unit_id'] = str(q['_id']), str(q['unit_id'])
+        question_list.append(q)
+    unit['_id'] = str(unit['_id'])
+
+    response = jsonify({
+        "unit": unit,
+        "questions": question_list,
+        "solved": sorted(str(q_id) for q_id in solved),
+        "helpStatus": {str(q_id): help_status(helps.get(q_id)) for q_id in q_ids},
+        "exp": total_exp
+    })
+    response.add_etag()
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response.make_conditional(request)
+
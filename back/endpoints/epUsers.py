@@ -2,8 +2,9 @@ import io, csv
 from flask import Blueprint, request, jsonify, current_app
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_jwt_extended import jwt_required, create_access_token, get_jwt_identity
-from extensions import mongo
-from utils import generate_random_password
+from repositories import get_repos
+from utils import generate_random_password, current_course
+from compression import stream_json_array
 from flask_mail import Mail, Message
 from bson import ObjectId
 from werkzeug.utils import secure_filename
@@ -16,16 +17,45 @@ users_bp = Blueprint('users', __name__)
 # -------------------------------
 @users_bp.route('/users', methods=['GET'])
 def get_users():
-    users = mongo.db.users.find()
-    all_users_data = []
+    """
+    Lista de usuarios con su exp total. Si el scheduler de jobs está activo se
+    sirve la última foto precalculada por el job "leaderboard" (header
+    X-Generated-At); con ?fresh=1 se calcula en el momento.
+    Con un curso seleccionado (ver utils.current_course) solo se listan sus
+    alumnos y la exp obtenida en ese curso.
+    """
+    repos = get_repos()
+    course_id = current_course()
+    if current_app.config.get("JOBS_ENABLED") and not request.args.get("fresh"):
+        snapshot = repos.snapshots.get(snapshot_name("leaderboard", course_id))
+        if snapshot:
+            response = stream_json_array(repos.snapshots.rows(snapshot))
+            response.headers["X-Generated-At"] = snapshot["generatedAt"].isoformat() + "Z"
+            return response
+
+    return stream_json_array(iter_users_list(repos, course_id))
+
+def snapshot_name(base, course_id=None):
+    """Nombre de la foto: `base` para todos los cursos, `base:-` para los sin curso."""
+    if course_id is None:
+        return base
+    return f"{base}:{course_id or '-'}"
+
+def iter_users_list(repos, course_id=None):
+    """Calcula la exp total de cada usuario (lo usa también el job "leaderboard")."""
+    users = repos.users.all(course_id)
 
     # Precargo todas las preguntas en un dict
-    questions = {q["_id"]: q for q in mongo.db.questions.find()}
+    questions = {q["_id"]: q for q in repos.questions.all(course_id)}
+    # Exp de los intentos ya compactados al archivo, por usuario
+    archived_exp = {}
+    for s in repos.summaries.for_user(course_id=course_id):
+        archived_exp[s["user_id"]] = archived_exp.get(s["user_id"], 0) + s.get("expAwarded", 0)
 
     for user in users:
-        totalExp = 0
+        totalExp = archived_exp.get(user["_id"], 0)
         # Obtengo todas las respuestas de este usuario
-        answers = mongo.db.answers.find({"user_id": user["_id"]})
+        answers = repos.answers.find(user_id=user["_id"], course_id=course_id)
 
         for ans in answers:
             q = questions.get(ans["question_id"])
@@ -50,10 +80,7 @@ def get_users():
                 continue
 
             # 2) Consulto si usó hints para esta pregunta
-            help_doc = mongo.db.question_helps.find_one({
-                "user_id": user["_id"],
-                "question_id": q["_id"]
-            }) or {}
+            help_doc = repos.helps.get_for(user["_id"], q["_id"]) or {}
 
             # 3) Sumo penalizaciones
             total_penalty = 0.0
@@ -68,7 +95,7 @@ def get_users():
             awarded = int(base_exp * (1 - total_penalty))
             totalExp += awarded
 
-        all_users_data.append({
+        yield {
             "user_id": str(user["_id"]),
             "DNI": user.get("DNI"),
             "name": user.get("name"),
@@ -76,9 +103,7 @@ def get_users():
             "email": user.get("email"),
             "role": user.get("role"),
             "exp": totalExp
-        })
-
-    return jsonify(all_users_data), 200
+        }
 
 # -------------------------------
 # Registro y Login
@@ -90,22 +115,27 @@ def register():
     name = data.get("name")
     lastname = data.get("lastname")
     email = data.get("email")
+    courses = data.get("courses") or []
     password = generate_random_password(12)
 
     if not username or not password:
         return jsonify({"error": "Faltan datos"}), 400
+    if not isinstance(courses, list) or not all(isinstance(c, str) for c in courses):
+        return jsonify({"error": "courses debe ser una lista de códigos de curso"}), 400
 
-    if mongo.db.users.find_one({"DNI": username}):
+    repos = get_repos()
+    if repos.users.by_dni(username):
         return jsonify({"error": "El usuario ya existe"}), 409
 
     hashed_password = generate_password_hash(password)
-    mongo.db.users.insert_one({
+    repos.users.create({
         "DNI": username,
         "name": name,
         "lastname": lastname,
         "email": email,
         "password": hashed_password,
-        "role": "user"
+        "role": "user",
+        "courses": courses
     })
 
     msg = Message("Credenciales para el taller de resolución de problemas", recipients=[email])
@@ -120,10 +150,15 @@ def login():
     username = data.get("DNI")
     password = data.get("password")
 
-    user = mongo.db.users.find_one({"DNI": username})
+    user = get_repos().users.by_dni(username)
     if user and check_password_hash(user["password"], password):
-        access_token = create_access_token(identity=username)
-        return jsonify({"access_token": access_token}), 200
+        # Los cursos y el rol viajan en el JWT para filtrar sin ir a la base
+        access_token = create_access_token(identity=username, additional_claims={
+            "courses": user.get("courses", []),
+            "role": user.get("role", "user")
+        })
+        # Los cursos también van en la respuesta para que el front elija uno (X-Course)
+        return jsonify({"access_token": access_token, "courses": user.get("courses", [])}), 200
     else:
         return jsonify({"error": "Credenciales inválidas"}), 401
 
@@ -134,13 +169,15 @@ def login():
 @jwt_required()
 def get_profile():
     current_dni = get_jwt_identity()
-    user = mongo.db.users.find_one({"DNI": current_dni})
+    repos = get_repos()
+    user = repos.users.by_dni(current_dni)
     if not user:
         return jsonify({"error": "Usuario no encontrado"}), 404
 
-    totalExp = 0
-    questions = {q["_id"]: q for q in mongo.db.questions.find()}
-    answers = mongo.db.answers.find({"user_id": user["_id"]})
+    course_id = current_course()
+    totalExp = sum(s.get("expAwarded", 0) for s in repos.summaries.for_user(user["_id"], course_id))
+    questions = {q["_id"]: q for q in repos.questions.all(course_id)}
+    answers = repos.answers.find(user_id=user["_id"], course_id=course_id)
 
     for ans in answers:
         q = questions.get(ans["question_id"])
@@ -163,10 +200,7 @@ def get_profile():
         if not is_correct:
             continue
 
-        help_doc = mongo.db.question_helps.find_one({
-            "user_id": user["_id"],
-            "question_id": q["_id"]
-        }) or {}
+        help_doc = repos.helps.get_for(user["_id"], q["_id"]) or {}
 
         total_penalty = 0.0
         if help_doc.get("usedHelp1"):
@@ -186,6 +220,7 @@ def get_profile():
         "lastname": user["lastname"],
         "email": user["email"],
         "role": user.get("role", ""),
+        "courses": user.get("courses", []),
         "exp": totalExp,
     }
     return jsonify(profile), 200
@@ -202,17 +237,15 @@ def update_profile():
     current_password = data["currentPassword"]
     new_password = data["password"]
 
-    user = mongo.db.users.find_one({"DNI": current_dni})
+    repos = get_repos()
+    user = repos.users.by_dni(current_dni)
     if not user:
         return jsonify({"error": "Usuario no encontrado"}), 404
 
     if not check_password_hash(user.get("password", ""), current_password):
         return jsonify({"error": "Contraseña actual incorrecta"}), 401
 
-    mongo.db.users.update_one(
-        {"DNI": current_dni},
-        {"$set": {"password": generate_password_hash(new_password)}}
-    )
+    repos.users.set_password(current_dni, generate_password_hash(new_password))
 
     return jsonify({"message": "Usuario actualizado exitosamente"}), 200
 
@@ -220,15 +253,23 @@ def update_profile():
 @jwt_required()
 def get_user_progress():
     current_dni = get_jwt_identity()
-    user = mongo.db.users.find_one({"DNI": current_dni})
+    repos = get_repos()
+    user = repos.users.by_dni(current_dni)
     if not user:
         return jsonify({"error": "Usuario no encontrado"}), 404
 
     user_id = user["_id"]
-    answers = mongo.db.answers.find({"user_id": user_id})
-    questions = {q["_id"]: q for q in mongo.db.questions.find()}
+    course_id = current_course()
+    answers = repos.answers.find(user_id=user_id, course_id=course_id)
+    questions = {q["_id"]: q for q in repos.questions.all(course_id)}
     progress_by_unit = {}
 
+    # Preguntas resueltas cuyos intentos ya fueron compactados
+    for summary in repos.summaries.for_user(user_id, course_id):
+        question = questions.get(summary["question_id"])
+        if question and summary.get("correctAttempts", 0) > 0:
+            progress_by_unit.setdefault(str(question.get("unit_id")), []).append(str(question["_id"]))
+
     for answer in answers:
         question = questions.get(answer.get("question_id"))
         if not question:
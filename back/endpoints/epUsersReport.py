@@ -1,6 +1,9 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from bson import ObjectId
-from extensions import mongo
+from repositories import get_repos, NO_COURSE
+from compression import stream_json_array
+from utils import current_course
+from endpoints.epUsers import snapshot_name
 from flask_jwt_extended import jwt_required
 # Asegúrate de tener importado ObjectId para convertir strings a ObjectId
 
@@ -12,42 +15,24 @@ def user_report():
     """
     Genera un informe de respuestas.
     - Si se envía el parámetro de consulta `user_id`, genera el informe solo para ese usuario.
-    - Si no se envía, genera el informe para todos los usuarios.
+    - Si no se envía, genera el informe para todos los usuarios. Con el
+      scheduler de jobs activo se sirve la última foto del job "users_report"
+      (header X-Generated-At); con ?fresh=1 se calcula en el momento.
     
     El informe de cada usuario contiene:
       - id, name y lastname.
       - Una lista de preguntas respondidas, cada una con:
           - los datos de la pregunta (por ejemplo, _id, type, body, exp, etc.)
           - la respuesta dada por el usuario.
+      - questions_archived: resumen por pregunta de los intentos ya
+        compactados al archivo (attempts, firstCorrectAt, expAwarded).
+
+    Con un curso seleccionado (ver utils.current_course) solo entran sus
+    alumnos y las respuestas dadas en ese curso.
     """
     user_id = request.args.get('user_id')
-    report = []
-
-    def build_user_report(user):
-        # Obtiene todas las respuestas del usuario y anida la información de la pregunta
-        user_obj_id = user["_id"]
-        answers_cursor = mongo.db.answers.find({"user_id": user_obj_id})
-        questions_list = []
-        for answer in answers_cursor:
-            q_id = answer.get("question_id")
-            question = mongo.db.questions.find_one({"_id": q_id})
-            if question:
-                question["_id"] = str(question["_id"])
-            answer["_id"] = str(answer["_id"])
-            answer["question_id"] = str(q_id)
-            questions_list.append({
-                "question": question,
-                "answer": answer
-            })
-        return {
-            "user": {
-                "id": str(user_obj_id),
-                "DNI": user.get("DNI"),
-                "name": user.get("name"),
-                "lastname": user.get("lastname")
-            },
-            "questions_answered": questions_list
-        }
+    repos = get_repos()
+    course_id = current_course()
 
     if user_id:
         # Informe para un usuario específico
@@ -56,14 +41,62 @@ def user_report():
         except Exception:
             return jsonify({"error": "user_id inválido"}), 400
 
-        user = mongo.db.users.find_one({"_id": user_obj_id})
+        user = repos.users.get(user_obj_id)
         if not user:
             return jsonify({"error": "Usuario no encontrado"}), 404
-        report = build_user_report(user)
-    else:
-        # Informe para todos los usuarios
-        users_cursor = mongo.db.users.find()
-        for user in users_cursor:
-            report.append(build_user_report(user))
+        # Solo alumnos del curso del request (los admin sin curso ven a todos)
+        if course_id is not None and course_id not in (user.get("courses") or [NO_COURSE]):
+            return jsonify({"error": "El usuario no pertenece a ese curso"}), 403
+        return jsonify(build_user_report(repos, user, course_id)), 200
+
+    # Informe para todos los usuarios
+    if current_app.config.get("JOBS_ENABLED") and not request.args.get("fresh"):
+        snapshot = repos.snapshots.get(snapshot_name("users_report", course_id))
+        if snapshot:
+            response = stream_json_array(repos.snapshots.rows(snapshot))
+            response.headers["X-Generated-At"] = snapshot["generatedAt"].isoformat() + "Z"
+            return response
+
+    return stream_json_array(iter_full_report(repos, course_id))
+
+def build_user_report(repos, user, course_id=None):
+    # Obtiene todas las respuestas del usuario y anida la información de la pregunta
+    user_obj_id = user["_id"]
+    answers_cursor = repos.answers.find(user_id=user_obj_id, course_id=course_id)
+    questions_list = []
+    for answer in answers_cursor:
+        q_id = answer.get("question_id")
+        question = repos.questions.get(q_id)
+        if question:
+            question["_id"] = str(question["_id"])
+            question["unit_id"] = str(question.get("unit_id"))
+        answer["_id"] = str(answer["_id"])
+        answer["question_id"] = str(q_id)
+        answer["user_id"] = str(user_obj_id)
+        questions_list.append({
+            "question": question,
+            "answer": answer
+        })
+    archived_list = []
+    for summary in repos.summaries.for_user(user_obj_id, course_id):
+        archived_list.append({
+            "question_id": str(summary["question_id"]),
+            "attempts": summary.get("attempts", 0),
+            "correctAttempts": summary.get("correctAttempts", 0),
+            "firstCorrectAt": summary.get("firstCorrectAt"),
+            "expAwarded": summary.get("expAwarded", 0)
+        })
+    return {
+        "user": {
+            "id": str(user_obj_id),
+            "DNI": user.get("DNI"),
+            "name": user.get("name"),
+            "lastname": user.get("lastname")
+        },
+        "questions_answered": questions_list,
+        "questions_archived": archived_list
+    }
 
-    return jsonify(report), 200
\ No newline at end of file
+def iter_full_report(repos, course_id=None):
+    """Informe de todos los usuarios, de a uno (lo usa también el job "users_report")."""
+    return (build_user_report(repos, user, course_id) for user in repos.users.all(course_id))
@@ -0,0 +1,135 @@
+# events.py
+# Log ordenado de eventos de respuestas para consumidores externos.
+#
+# create_answer y los endpoints de ayudas agregan eventos chicos a la colección
+# `answer_events`, cada uno con un número de secuencia creciente:
+#   - answer_graded: se corrigió un intento (correct, expAwarded)
+#   - exp_awarded:   se sumó exp a un usuario
+#   - hint_used:     se pidió un hint de una pregunta
+# Los consumidores (analítica, ranking, notificaciones, panel docente) leen con
+# GET /events y un cursor opaco, y retoman desde donde quedaron en vez de
+# recorrer GET /answers entero.
+#
+# Outbox: los eventos se guardan primero como `pendingEvents` dentro del mismo
+# documento que cambia (la respuesta, o el registro de hints del usuario),
+# en la misma escritura atómica. Después `relay` los copia al log y los saca
+# del documento. Si el relay falla o el proceso se cae en el medio, quedan
+# pendientes y los pasa el job "relay_events" o la próxima lectura de
+# GET /events. Cada evento lleva una `key` única, así que pasarlo dos veces no
+# lo duplica en el log.
+#
+# Un consumidor nunca saltea un evento: los eventos se confirman en el orden
+# de su secuencia (en SQLite las escrituras se serializan; en Mongo la reserva
+# de la secuencia y el insert van en una transacción). Solo un mongod suelto,
+# sin transacciones, puede confirmar fuera de orden: ahí la lectura se corta
+# en el primer evento que entró al log (loggedAt) hace menos de
+# EVENTS_SETTLE_MS y esos se entregan en el próximo pedido. Es un margen para
+# desarrollo; si una escritura tarda más que eso, el orden no está garantizado.
+
+import base64
+import binascii
+from datetime import datetime, timedelta
+from bson import ObjectId
+from flask import current_app
+
+ANSWER_GRADED = "answer_graded"
+EXP_AWARDED = "exp_awarded"
+HINT_USED = "hint_used"
+EVENT_TYPES = (ANSWER_GRADED, EXP_AWARDED, HINT_USED)
+
+CURSOR_PREFIX = "ev1:"
+# Repositorios con eventos pendientes embebidos
+OUTBOX_SOURCES = ("answers", "helps")
+
+
+def answer_events(answer_id, user_id, question, correct, exp_awarded, when):
+    """Eventos de un intento corregido (answer_graded y, si sumó, exp_awarded)."""
+    base = {"at": when, "user_id": user_id, "question_id": question["_id"],
+            "answer_id": answer_id, "course_id": question.get("course_id")}
+    events = [dict(base, type=ANSWER_GRADED, key=f"{answer_id}:{ANSWER_GRADED}",
+                   correct=correct, expAwarded=exp_awarded)]
+    if exp_awarded:
+        events.append(dict(base, type=EXP_AWARDED, key=f"{answer_id}:{EXP_AWARDED}", amount=exp_awarded))
+    return events
+
+
+def hint_events(user_id, requested, questions, when):
+    """Un hint_used por cada (question_id, helpNumber) pedido."""
+    return [
+        {"type": HINT_USED, "key": str(ObjectId()), "at": when, "user_id": user_id,
+         "question_id": q_id, "helpNumber": h, "course_id": questions[q_id].get("course_id")}
+        for q_id, h in requested
+    ]
+
+
+def relay(repos, source, doc_id, events):
+    """
+    Pasa al log los eventos pendientes de un documento y los saca de él.
+    Se llama justo después de la escritura; si falla, el evento sigue
+    pendiente en el documento y se reintenta después (ver relay_pending).
+    """
+    if not events:
+        return 0
+    try:
+        repos.events.append(events)
+        getattr(repos, source).clear_pending(doc_id, [ev["key"] for ev in events])
+    except Exception:
+        current_app.logger.exception("No se pudieron pasar %d eventos al log; quedan pendientes", len(events))
+        return 0
+    return len(events)
+
+
+def relay_hints(repos, updated, events):
+    """relay de los eventos de mark_used, agrupados por registro de hints."""
+    for q_id, doc in updated.items():
+        relay(repos, "helps", doc["_id"], [ev for ev in events if ev["question_id"] == q_id])
+
+
+def relay_pending(repos, limit=100, ids=None, sources=OUTBOX_SOURCES):
+    """Pasa al log los eventos que quedaron pendientes. Devuelve cuántos pasó."""
+    total = 0
+    for source in sources:
+        for doc in getattr(repos, source).with_pending(limit, ids):
+            total += relay(repos, source, doc["_id"], doc["pendingEvents"])
+    return total
+
+
+# -------------------------------
+# Cursores
+# -------------------------------
+def encode_cursor(seq):
+    return base64.urlsafe_b64encode(f"{CURSOR_PREFIX}{seq}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """Secuencia del último evento leído. ValueError si el cursor no es válido."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError("Cursor inválido")
+    if not raw.startswith(CURSOR_PREFIX) or not raw[len(CURSOR_PREFIX):].isdigit():
+        raise ValueError("Cursor inválido")
+    return int(raw[len(CURSOR_PREFIX):])
+
+
+def read_events(repos, after, limit, types=None, course_id=None):
+    """
+    Hasta `limit` eventos posteriores a la secuencia `after`.
+    Devuelve (eventos, secuencia del último entregado, hay_más). Al cortar en
+    la ventana de EVENTS_SETTLE_MS hay_más es False: lo que falta todavía no
+    se puede entregar y el consumidor tiene que esperar antes de volver.
+    """
+    relay_pending(repos)
+    batch = repos.events.after(after, limit, types, course_id)
+    if not repos.events.commits_in_order:
+        settle = timedelta(milliseconds=current_app.config.get("EVENTS_SETTLE_MS", 1000))
+        horizon = datetime.utcnow() - settle
+        for i, ev in enumerate(batch):
+            if ev.get("loggedAt", ev["at"]) > horizon:
+                batch = batch[:i]
+                return batch, batch[-1]["_id"] if batch else after, False
+    return batch, batch[-1]["_id"] if batch else after, len(batch) == limit
+
+
+def prune_events(repos, max_age_days):
+    return repos.events.delete_before(datetime.utcnow() - timedelta(days=max_age_days))
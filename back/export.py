@@ -0,0 +1,221 @@
+# export.py
+# Exportación columnar (Parquet) de answers, question_helps, questions y users
+# para análisis offline.
+#
+# Cada colección se lee con un cursor por lotes y cada lote se escribe como un
+# row group, así que la memoria usada no depende del tamaño de la colección.
+# En modo incremental solo se exporta lo creado o modificado después de la
+# última marca de agua (guardada en `export_watermarks`) y cada corrida genera
+# un archivo nuevo. Un documento modificado vuelve a salir en la corrida
+# siguiente: para la versión vigente se toma la fila con `updated_at` (o
+# `timestamp`) más nuevo de cada `_id`.
+#
+# La marca es el par (marca de cambio, _id) del último documento exportado y
+# nunca llega a menos de EXPORT_SAFETY_WINDOW_SECONDS de ahora: así no se
+# saltean escrituras que se confirman tarde o que el secundario todavía no
+# replicó (ver READ_MAX_STALENESS_SECONDS).
+
+import os
+import json
+from datetime import datetime, timedelta
+from bson import ObjectId
+from flask import current_app
+from repositories import get_repos
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+DEFAULT_EXPORT_DIR = os.path.join(BASE_DIR, 'exports')
+BATCH_SIZE = 5000
+
+
+def _oid(value):
+    return str(value) if value is not None else None
+
+
+def _created_at(doc):
+    return doc["_id"].generation_time.replace(tzinfo=None)
+
+
+def _json(value):
+    return json.dumps(value, default=str) if value is not None else None
+
+
+# Columnas de cada colección: (nombre, tipo pyarrow, función que lo extrae del documento).
+# Los datos anidados (opciones, hints) se exportan como JSON y nunca se exporta
+# el hash de la contraseña.
+def _schemas(pa):
+    return {
+        "answers": [
+            ("_id", pa.string(), lambda d: _oid(d["_id"])),
+            ("question_id", pa.string(), lambda d: _oid(d.get("question_id"))),
+            ("user_id", pa.string(), lambda d: _oid(d.get("user_id"))),
+            ("body", pa.string(), lambda d: d.get("body")),
+            ("selectedOption", pa.string(), lambda d: _oid(d.get("selectedOption"))),
+            ("course_id", pa.string(), lambda d: d.get("course_id")),
+            ("created_at", pa.timestamp("ms"), _created_at),
+            ("updated_at", pa.timestamp("ms"), lambda d: d.get("updatedAt")),
+        ],
+        "question_helps": [
+            ("_id", pa.string(), lambda d: _oid(d["_id"])),
+            ("user_id", pa.string(), lambda d: _oid(d.get("user_id"))),
+            ("question_id", pa.string(), lambda d: _oid(d.get("question_id"))),
+            ("usedHelp1", pa.bool_(), lambda d: bool(d.get("usedHelp1", False))),
+            ("usedHelp2", pa.bool_(), lambda d: bool(d.get("usedHelp2", False))),
+            ("timestamp", pa.timestamp("ms"), lambda d: d.get("timestamp")),
+        ],
+        "questions": [
+            ("_id", pa.string(), lambda d: _oid(d["_id"])),
+            ("unit_id", pa.string(), lambda d: _oid(d.get("unit_id"))),
+            ("course_id", pa.string(), lambda d: d.get("course_id")),
+            ("type", pa.string(), lambda d: d.get("type")),
+            ("body", pa.string(), lambda d: d.get("body")),
+            ("exp", pa.float64(), lambda d: d.get("exp")),
+            ("expectedAnswer", pa.string(), lambda d: d.get("expectedAnswer")),
+            ("options", pa.string(), lambda d: _json(d.get("options"))),
+            ("hint1_penalty", pa.float64(), lambda d: d.get("hint1", {}).get("penalty")),
+            ("hint2_penalty", pa.float64(), lambda d: d.get("hint2", {}).get("penalty")),
+            ("created_at", pa.timestamp("ms"), _created_at),
+            ("updated_at", pa.timestamp("ms"), lambda d: d.get("updatedAt")),
+        ],
+        "users": [
+            ("_id", pa.string(), lambda d: _oid(d["_id"])),
+            ("DNI", pa.string(), lambda d: _oid(d.get("DNI"))),
+            ("name", pa.string(), lambda d: d.get("name")),
+            ("lastname", pa.string(), lambda d: d.get("lastname")),
+            ("email", pa.string(), lambda d: d.get("email")),
+            ("role", pa.string(), lambda d: d.get("role")),
+            ("courses", pa.list_(pa.string()), lambda d: d.get("courses") or []),
+            ("exp", pa.float64(), lambda d: d.get("exp")),
+            ("created_at", pa.timestamp("ms"), _created_at),
+            ("updated_at", pa.timestamp("ms"), lambda d: d.get("updatedAt")),
+        ],
+    }
+
+# Campo con la fecha de la última escritura de cada colección (el `scan_field`
+# de su repositorio): users, questions y answers lo marcan en cada escritura y
+# question_helps usa el timestamp del último hint pedido.
+WATERMARK_FIELDS = {
+    "answers": "updatedAt",
+    "question_helps": "timestamp",
+    "questions": "updatedAt",
+    "users": "updatedAt",
+}
+COLLECTIONS = tuple(WATERMARK_FIELDS)
+# Repositorio (de repositories.get_repos) que corresponde a cada colección
+REPOSITORIES = {
+    "answers": "answers",
+    "question_helps": "helps",
+    "questions": "questions",
+    "users": "users",
+}
+
+
+def export_dir():
+    path = current_app.config.get("EXPORT_DIR") or DEFAULT_EXPORT_DIR
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _watermark(mark):
+    """Par (valor, _id) desde donde seguir, o None para exportar todo."""
+    if not mark:
+        return None
+    value = mark.get("value")
+    if isinstance(value, ObjectId):
+        # Marca de versiones anteriores (por _id): los documentos sin updatedAt
+        # lo reciben con la fecha de creación del _id (ver ensure_indexes)
+        return value.generation_time.replace(tzinfo=None), value
+    return value, mark.get("id")
+
+
+def _load_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("La exportación requiere pyarrow (pip install pyarrow)")
+    return pa, pq
+
+
+def export_collection(name, incremental=True, directory=None, pa=None, pq=None):
+    """
+    Exporta una colección a `<directory>/<name>/<name>-<fecha>.parquet`.
+    Devuelve {"collection", "file", "rows", "watermark"}; `file` es None si no
+    había documentos nuevos.
+    """
+    if pa is None:
+        pa, pq = _load_pyarrow()
+    directory = directory or export_dir()
+    columns = _schemas(pa)[name]
+    schema = pa.schema([(col, typ) for col, typ, _ in columns])
+    field = WATERMARK_FIELDS[name]
+
+    repos = get_repos("reporting")
+    mark = repos.watermarks.get(name) if incremental else None
+
+    out_dir = os.path.join(directory, name)
+    os.makedirs(out_dir, exist_ok=True)
+    # Con microsegundos: dos corridas seguidas nunca comparten archivo
+    path = os.path.join(out_dir, f"{name}-{datetime.utcnow():%Y%m%dT%H%M%S%f}.parquet")
+
+    # La lectura masiva va a un secundario para no competir con la carga de respuestas
+    last = _watermark(mark)
+    window = current_app.config.get("EXPORT_SAFETY_WINDOW_SECONDS", 120)
+    until = datetime.utcnow() - timedelta(seconds=window)
+    cursor = getattr(repos, REPOSITORIES[name]).scan(after=last, batch_size=BATCH_SIZE, until=until)
+    out = None
+    rows = 0
+    batch = []
+    try:
+        for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= BATCH_SIZE:
+                out = _write_batch(pa, pq, out, path, schema, columns, batch)
+                rows += len(batch)
+                last = (batch[-1].get(field), batch[-1]["_id"])
+                batch = []
+        if batch:
+            out = _write_batch(pa, pq, out, path, schema, columns, batch)
+            rows += len(batch)
+            last = (batch[-1].get(field), batch[-1]["_id"])
+    finally:
+        if out:
+            sink, writer = out
+            writer.close()
+            sink.close()
+
+    if rows:
+        # La marca solo avanza cuando el archivo quedó escrito completo
+        get_repos("primary").watermarks.set(name, {
+            "value": last[0], "id": last[1],
+            "updatedAt": datetime.utcnow(), "lastFile": os.path.basename(path)
+        })
+    return {
+        "collection": name,
+        "file": os.path.relpath(path, directory) if rows else None,
+        "rows": rows,
+        "watermark": str(last[0]) if last is not None else None
+    }
+
+
+def _write_batch(pa, pq, out, path, schema, columns, batch):
+    """
+    Escribe un lote como row group. `out` es (archivo, writer), o None en el
+    primer lote: el archivo se crea en modo exclusivo, así que si ya existe
+    la corrida falla (y la marca no avanza) en vez de pisar otra exportación.
+    """
+    arrays = [pa.array([get(d) for d in batch], type=typ) for _, typ, get in columns]
+    table = pa.Table.from_arrays(arrays, schema=schema)
+    if out is None:
+        sink = open(path, "xb")
+        out = (sink, pq.ParquetWriter(sink, schema, compression="zstd"))
+    out[1].write_table(table)
+    return out
+
+
+def export_all(collections=COLLECTIONS, incremental=True, directory=None):
+    """Exporta todas las colecciones pedidas y devuelve el detalle de cada una."""
+    pa, pq = _load_pyarrow()
+    return [
+        export_collection(name, incremental=incremental, directory=directory, pa=pa, pq=pq)
+        for name in collections
+    ]
@@ -1,3 +1,41 @@
+from flask import current_app, request, g, has_request_context
 from flask_pymongo import PyMongo
+from pymongo.read_preferences import Primary, SecondaryPreferred
+from pymongo.read_concern import ReadConcern
 
 mongo = PyMongo()
+
+# -------------------------------
+# Ruteo de lecturas
+# -------------------------------
+# "primary": corrección de respuestas y escrituras (lee lo último escrito).
+# "reporting": reportes y analítica; van a un secundario si hay alguno con
+#   retraso menor a READ_MAX_STALENESS_SECONDS, y si no al primario.
+def _read_options(policy):
+    if policy == "reporting":
+        staleness = current_app.config.get("READ_MAX_STALENESS_SECONDS", 90)
+        return {
+            "read_preference": SecondaryPreferred(max_staleness=staleness),
+            "read_concern": ReadConcern("local"),
+        }
+    return {"read_preference": Primary(), "read_concern": ReadConcern()}
+
+def read_policy_for_request():
+    """Política de lectura de la ruta actual según READ_ROUTING (endpoint o blueprint)."""
+    if not has_request_context():
+        return "primary"
+    routing = current_app.config.get("READ_ROUTING", {})
+    return routing.get(request.endpoint) or routing.get(request.blueprint) or "primary"
+
+def read_db(policy=None):
+    """
+    Devuelve la base con la read preference / read concern de la política
+    (por defecto, la configurada para la ruta actual).
+    """
+    policy = policy or read_policy_for_request()
+    if has_request_context():
+        g.read_policy = policy
+    dbs = current_app.extensions.setdefault("read_dbs", {})
+    if policy not in dbs:
+        dbs[policy] = mongo.db.with_options(**_read_options(policy))
+    return dbs[policy]
@@ -0,0 +1,225 @@
+# jobs.py
+# Jobs en segundo plano: precálculo de reportes y tareas de mantenimiento.
+#
+# Cada job tiene un horario estilo cron y su estado persistido en la colección
+# `jobs` (próxima corrida, última corrida, error, lock). Cada proceso de la API
+# corre un Scheduler; antes de ejecutar un job lo "toma" con un lock atómico
+# en la base, así que aunque haya varios workers de gunicorn cada corrida la
+# hace uno solo. Los resultados quedan en `snapshots` con su fecha de
+# generación y los endpoints sirven la última foto.
+
+import os
+import socket
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from repositories import get_repos, NO_COURSE
+
+JOBS = {}
+
+
+def job(name, schedule):
+    """Registra una función como job con un horario cron ("*/5 * * * *")."""
+    def decorator(fn):
+        JOBS[name] = {"fn": fn, "schedule": schedule, "cron": Cron(schedule)}
+        return fn
+    return decorator
+
+
+# -------------------------------
+# Horarios cron (minuto hora día-del-mes mes día-de-la-semana)
+# -------------------------------
+class Cron:
+    RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 6)]
+
+    def __init__(self, expr):
+        fields = expr.split()
+        if len(fields) != 5:
+            raise ValueError(f"Horario cron inválido: {expr}")
+        self.minutes, self.hours, self.days, self.months, self.weekdays = [
+            self._parse(f, lo, hi) for f, (lo, hi) in zip(fields, self.RANGES)
+        ]
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    @staticmethod
+    def _parse(field, lo, hi):
+        values = set()
+        for part in field.split(","):
+            step = 1
+            if "/" in part:
+                part, step = part.split("/")
+                step = int(step)
+            if part == "*":
+                start, end = lo, hi
+            elif "-" in part:
+                start, end = (int(x) for x in part.split("-"))
+            else:
+                start = int(part)
+                end = hi if step > 1 else start
+            if start < lo or end > hi:
+                raise ValueError(f"Valor fuera de rango en '{field}'")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, dt):
+        weekday = (dt.weekday() + 1) % 7   # cron: 0 = domingo
+        day_ok = dt.day in self.days
+        weekday_ok = weekday in self.weekdays
+        # Como en cron: si se restringen ambos, alcanza con que coincida uno
+        if not self.any_day and not self.any_weekday:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_after(self, dt):
+        """Próximo instante (al minuto) estrictamente posterior a `dt`."""
+        dt = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = dt + timedelta(days=366 * 5)
+        while dt < limit:
+            if dt.month not in self.months or not self._day_matches(dt):
+                dt = (dt + timedelta(days=1)).replace(hour=0, minute=0)
+            elif dt.hour not in self.hours:
+                dt = (dt + timedelta(hours=1)).replace(minute=0)
+            elif dt.minute not in self.minutes:
+                dt += timedelta(minutes=1)
+            else:
+                return dt
+        raise ValueError("El horario cron nunca se cumple")
+
+
+# -------------------------------
+# Scheduler
+# -------------------------------
+class Scheduler:
+    def __init__(self, app):
+        self.app = app
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.poll_seconds = app.config.get("JOBS_POLL_SECONDS", 30)
+        self.lease = timedelta(seconds=app.config.get("JOBS_LEASE_SECONDS", 15 * 60))
+        self.executor = ThreadPoolExecutor(
+            max_workers=app.config.get("JOBS_WORKERS", 2), thread_name_prefix="job"
+        )
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        with self.app.app_context():
+            repos = get_repos("primary")
+            now = datetime.utcnow()
+            for name, spec in JOBS.items():
+                repos.jobs.register(name, spec["schedule"], spec["cron"].next_after(now))
+        self._thread = threading.Thread(target=self._loop, name="job-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self.executor.shutdown(wait=False)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except Exception:
+                self.app.logger.exception("Error en el scheduler de jobs")
+            self._stop.wait(self.poll_seconds)
+
+    def tick(self):
+        """Toma y lanza los jobs a los que ya les toca correr."""
+        with self.app.app_context():
+            repos = get_repos("primary")
+            now = datetime.utcnow()
+            for name in JOBS:
+                acquired = repos.jobs.acquire(name, self.owner, now, now + self.lease)
+                if acquired:
+                    self.executor.submit(self._run, name, acquired.get("nextRunAt"))
+
+    def _heartbeat(self, name, done):
+        """
+        Renueva el lock cada un tercio del lease mientras el job corre, así un
+        job más largo que el lease no lo toma otro worker a la vez.
+        """
+        interval = self.lease.total_seconds() / 3
+        while not done.wait(interval):
+            try:
+                with self.app.app_context():
+                    if not get_repos("primary").jobs.renew(name, self.owner, datetime.utcnow() + self.lease):
+                        self.app.logger.warning("El job %s perdió el lock mientras corría", name)
+                        return
+            except Exception:
+                self.app.logger.exception("No se pudo renovar el lock del job %s", name)
+
+    def _run(self, name, due_at):
+        spec = JOBS[name]
+        done = threading.Event()
+        threading.Thread(target=self._heartbeat, args=(name, done), name="job-heartbeat", daemon=True).start()
+        with self.app.app_context():
+            started = datetime.utcnow()
+            fields = {"lastRunAt": started, "lastRunBy": self.owner, "lastError": None}
+            try:
+                spec["fn"]()
+                fields["lastStatus"] = "ok"
+            except Exception as e:
+                self.app.logger.exception("Falló el job %s", name)
+                fields["lastStatus"] = "error"
+                fields["lastError"] = str(e)
+            finally:
+                done.set()
+            finished = datetime.utcnow()
+            fields["lastDurationSeconds"] = (finished - started).total_seconds()
+            get_repos("primary").jobs.release(
+                name, self.owner, fields, spec["cron"].next_after(finished), due_at
+            )
+
+
+def start_scheduler(app):
+    scheduler = Scheduler(app)
+    scheduler.start()
+    app.extensions["scheduler"] = scheduler
+    return scheduler
+
+
+# -------------------------------
+# Jobs
+# -------------------------------
+def _all_courses(repos):
+    """None (todos los cursos juntos, para admin), los sin curso y cada curso con unidades."""
+    return [None, NO_COURSE] + repos.units.course_ids()
+
+
+@job("leaderboard", "*/5 * * * *")
+def rebuild_leaderboard():
+    from endpoints.epUsers import iter_users_list, snapshot_name
+    repos = get_repos("reporting")
+    for course_id in _all_courses(repos):
+        generated_at = datetime.utcnow()
+        rows = iter_users_list(repos, course_id)
+        get_repos("primary").snapshots.put(snapshot_name("leaderboard", course_id), rows, generated_at)
+
+
+@job("users_report", "0 * * * *")
+def rebuild_users_report():
+    from endpoints.epUsers import snapshot_name
+    from endpoints.epUsersReport import iter_full_report
+    repos = get_repos("reporting")
+    for course_id in _all_courses(repos):
+        generated_at = datetime.utcnow()
+        rows = iter_full_report(repos, course_id)
+        get_repos("primary").snapshots.put(snapshot_name("users_report", course_id), rows, generated_at)
+
+
+@job("relay_events", "* * * * *")
+def relay_pending_events():
+    from events import relay_pending
+    relay_pending(get_repos("primary"), current_app.config.get("EVENTS_RELAY_BATCH", 500))
+
+
+@job("prune_events", "15 4 * * *")
+def prune_old_events():
+    from events import prune_events
+    prune_events(get_repos("primary"), current_app.config.get("EVENTS_RETENTION_DAYS", 30))
+
+
+@job("ensure_indexes", "30 4 * * *")
+def check_indexes():
+    get_repos("primary").ensure_indexes()
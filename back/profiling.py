@@ -0,0 +1,128 @@
+# profiling.py
+# Profiling por muestreo de requests individuales.
+#
+# Se perfila un porcentaje de los requests (PROFILE_SAMPLE_RATE, 0 = nunca) o
+# los que mande un admin con el header "X-Profile: 1". Mientras dura el
+# request (incluido el envío de respuestas en streaming) un hilo toma la pila
+# del hilo que lo atiende cada PROFILE_INTERVAL_MS milisegundos. Las pilas se
+# guardan en formato "collapsed" (una línea "f1;f2;f3 N" por pila), que leen
+# tanto flamegraph.pl como speedscope. Se conservan los últimos
+# PROFILE_MAX_FILES archivos.
+
+import os
+import sys
+import random
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from flask import current_app, request, g
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from repositories import get_repos
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+DEFAULT_PROFILE_DIR = os.path.join(BASE_DIR, 'profiles')
+
+
+def profile_dir():
+    path = current_app.config.get("PROFILE_DIR") or DEFAULT_PROFILE_DIR
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class StackSampler:
+    """Muestrea periódicamente la pila de un hilo y acumula las pilas colapsadas."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def _admin_requested():
+    if request.headers.get("X-Profile") != "1":
+        return False
+    try:
+        verify_jwt_in_request(optional=True)
+        dni = get_jwt_identity()
+    except Exception:
+        return False
+    if not dni:
+        return False
+    user = get_repos("primary").users.by_dni(dni, {"role": 1})
+    return bool(user and user.get("role") == "admin")
+
+
+def start_profiling():
+    rate = current_app.config.get("PROFILE_SAMPLE_RATE", 0.0)
+    if not (rate > 0 and random.random() < rate) and not _admin_requested():
+        return
+    interval = current_app.config.get("PROFILE_INTERVAL_MS", 5) / 1000.0
+    g.profiler = StackSampler(threading.get_ident(), interval).start()
+
+
+def finish_profiling(response):
+    sampler = g.pop("profiler", None)
+    if sampler is None:
+        return response
+    directory = profile_dir()
+    endpoint = (request.endpoint or "unknown").replace(".", "-")
+    max_files = current_app.config.get("PROFILE_MAX_FILES", 200)
+    logger = current_app.logger
+
+    # Se cierra al terminar de enviar el cuerpo, así cubre también el streaming
+    def write_profile():
+        sampler.stop()
+        name = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{endpoint}-{int(sampler.elapsed * 1000)}ms.collapsed"
+        try:
+            with open(os.path.join(directory, name), "w", encoding="utf-8") as fh:
+                fh.write(sampler.collapsed())
+            _rotate(directory, max_files)
+        except OSError:
+            logger.exception("No se pudo guardar el profile %s", name)
+
+    response.call_on_close(write_profile)
+    response.headers["X-Profiled"] = "1"
+    return response
+
+
+def _rotate(directory, max_files):
+    files = sorted(f for f in os.listdir(directory) if f.endswith(".collapsed"))
+    for old in files[:-max_files] if max_files > 0 else []:
+        try:
+            os.remove(os.path.join(directory, old))
+        except OSError:
+            pass
+
+
+def init_profiling(app):
+    app.before_request(start_profiling)
+    app.after_request(finish_profiling)
@@ -0,0 +1,48 @@
+# Capa de acceso a datos.
+#
+# Los endpoints no usan `mongo.db` directamente sino `get_repos()`, que
+# devuelve los repositorios (users, units, questions, answers, helps,
+# summaries, watermarks, compactions, jobs, snapshots, events) del motor
+# configurado en STORAGE_ENGINE:
+#   - "mongo" (por defecto): MongoDB vía Flask-PyMongo, respetando el ruteo
+#     de lecturas de extensions.read_db.
+#   - "sqlite": base embebida en el proceso (SQLITE_PATH, o ":memory:"),
+#     pensada para instalaciones chicas de un solo equipo y para pruebas.
+#
+# Todos los repositorios devuelven documentos con la forma de Mongo (dicts con
+# `_id` ObjectId), así que el código de los endpoints no depende del motor.
+import os
+from flask import current_app
+
+# course_id que selecciona los documentos sin curso (None selecciona todos)
+NO_COURSE = ""
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+DEFAULT_SQLITE_PATH = os.path.join(BASE_DIR, 'data', 'trp.sqlite3')
+
+
+def init_storage(app):
+    engine = app.config.get("STORAGE_ENGINE") or "mongo"
+    if engine == "mongo":
+        from extensions import mongo
+        from repositories.mongo import MongoStorage
+        mongo.init_app(app)
+        storage = MongoStorage()
+    elif engine == "sqlite":
+        from repositories.sqlite import SqliteStorage
+        path = app.config.get("SQLITE_PATH") or DEFAULT_SQLITE_PATH
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        storage = SqliteStorage(path)
+    else:
+        raise ValueError(f"STORAGE_ENGINE desconocido: {engine}")
+    app.extensions["storage"] = storage
+    return storage
+
+
+def get_repos(policy=None):
+    """
+    Repositorios del motor configurado. `policy` es la política de lectura
+    ("primary" / "reporting"); por defecto la de la ruta actual.
+    """
+    return current_app.extensions["storage"].repos(policy)
@@ -0,0 +1,471 @@
+# Implementación MongoDB de los repositorios.
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, BulkWriteError
+from extensions import read_db
+from repositories import NO_COURSE
+
+
+class MongoCollection:
+    """Operaciones comunes sobre una colección (por _id)."""
+    name = None
+    scan_field = "_id"
+    # Campo con el curso del documento (en users es la lista "courses")
+    course_field = "course_id"
+    # Si cada escritura marca `updatedAt` (lo usa la exportación incremental)
+    tracks_updates = False
+    # Campos que no se devuelven en las lecturas
+    projection = None
+
+    def __init__(self, db):
+        self.col = db[self.name]
+
+    def _course_query(self, course_id):
+        """Filtro por curso: None = todos, NO_COURSE = los que no tienen curso."""
+        if course_id is None:
+            return {}
+        if course_id == NO_COURSE:
+            return {self.course_field: {"$in": [None, []]}}
+        return {self.course_field: course_id}
+
+    def all(self, course_id=None):
+        """Todos los documentos, o solo los del curso indicado."""
+        return self.col.find(self._course_query(course_id), self.projection)
+
+    def get(self, doc_id):
+        return self.col.find_one({"_id": doc_id}, self.projection)
+
+    def by_ids(self, ids):
+        return self.col.find({"_id": {"$in": list(ids)}}, self.projection)
+
+    def _stamp(self, fields):
+        return dict(fields, updatedAt=datetime.utcnow()) if self.tracks_updates else fields
+
+    def create(self, doc):
+        return self.col.insert_one(self._stamp(doc)).inserted_id
+
+    def update(self, doc_id, fields):
+        return self.col.update_one({"_id": doc_id}, {"$set": self._stamp(fields)}).matched_count > 0
+
+    def delete(self, doc_id):
+        return self.col.delete_one({"_id": doc_id}).deleted_count > 0
+
+    def scan(self, after=None, batch_size=1000, until=None):
+        """
+        Recorre la colección ordenada por (`scan_field`, _id). `after` es el
+        par (valor, _id) del último documento leído (excluido; con _id None se
+        incluyen los de ese mismo valor) y `until` corta en los de valor >= until.
+        """
+        field = self.scan_field
+        conditions = []
+        if after is not None:
+            value, last_id = after
+            if field == "_id" or last_id is None:
+                conditions.append({field: {"$gt" if field == "_id" else "$gte": value}})
+            else:
+                conditions.append({"$or": [
+                    {field: {"$gt": value}},
+                    {field: value, "_id": {"$gt": last_id}},
+                ]})
+        if until is not None:
+            conditions.append({field: {"$lt": until}})
+        query = {"$and": conditions} if conditions else {}
+        sort = [(field, 1)] if field == "_id" else [(field, 1), ("_id", 1)]
+        return self.col.find(query, self.projection).sort(sort).batch_size(batch_size)
+
+
+class MongoOutbox:
+    """
+    Colección con eventos pendientes embebidos en sus documentos
+    (`pendingEvents`): se guardan en la misma escritura atómica que el cambio
+    y después events.relay los pasa al log. No se devuelven en las lecturas.
+    """
+    projection = {"pendingEvents": 0}
+
+    def with_pending(self, limit=100, ids=None):
+        query = {"pendingEvents.key": {"$exists": True}}
+        if ids is not None:
+            query["_id"] = {"$in": list(ids)}
+        return list(self.col.find(query, {"pendingEvents": 1}).limit(limit))
+
+    def clear_pending(self, doc_id, keys):
+        self.col.update_one({"_id": doc_id}, {"$pull": {"pendingEvents": {"key": {"$in": list(keys)}}}})
+
+
+class MongoUsers(MongoCollection):
+    name = "users"
+    course_field = "courses"
+    scan_field = "updatedAt"
+    tracks_updates = True
+
+    def by_dni(self, dni, fields=None):
+        return self.col.find_one({"DNI": dni}, fields)
+
+    def set_password(self, dni, hashed):
+        self.col.update_one({"DNI": dni}, {"$set": self._stamp({"password": hashed})})
+
+    def add_exp(self, user_id, amount):
+        self.col.update_one({"_id": user_id}, {"$inc": {"exp": amount}, "$set": self._stamp({})})
+
+
+class MongoUnits(MongoCollection):
+    name = "units"
+
+    def course_ids(self):
+        return [c for c in self.col.distinct("course_id") if c is not None]
+
+
+class MongoQuestions(MongoCollection):
+    name = "questions"
+    scan_field = "updatedAt"
+    tracks_updates = True
+
+    def by_unit(self, unit_id):
+        return self.col.find({"unit_id": unit_id})
+
+    def ids_by_unit(self, unit_id):
+        return [q["_id"] for q in self.col.find({"unit_id": unit_id}, {"_id": 1})]
+
+
+class MongoAnswers(MongoOutbox, MongoCollection):
+    name = "answers"
+    scan_field = "updatedAt"
+    tracks_updates = True
+
+    def find(self, user_id=None, question_id=None, question_ids=None, course_id=None):
+        query = self._course_query(course_id)
+        if user_id is not None:
+            query["user_id"] = user_id
+        if question_id is not None:
+            query["question_id"] = question_id
+        elif question_ids is not None:
+            query["question_id"] = {"$in": list(question_ids)}
+        return self.col.find(query, self.projection)
+
+    def created_before(self, before_id, limit):
+        """Los `limit` intentos más viejos con _id menor a `before_id`."""
+        return list(self.col.find({"_id": {"$lt": before_id}}, self.projection).sort("_id", 1).limit(limit))
+
+    def delete_many(self, ids):
+        return self.col.delete_many({"_id": {"$in": list(ids)}}).deleted_count
+
+
+class MongoHelps(MongoOutbox, MongoCollection):
+    name = "question_helps"
+    scan_field = "timestamp"
+
+    def get_for(self, user_id, question_id):
+        return self.col.find_one({"user_id": user_id, "question_id": question_id}, self.projection)
+
+    def for_user(self, user_id, question_ids):
+        return self.col.find({"user_id": user_id, "question_id": {"$in": list(question_ids)}}, self.projection)
+
+    def mark_used(self, user_id, requested, when, events=()):
+        """
+        Registra los hints pedidos: `requested` = [(question_id, helpNumber), ...].
+        Una escritura atómica por pregunta (todos sus hints juntos, y sus
+        `events` como pendientes) que devuelve el documento tal como quedó.
+        Devuelve {question_id: documento}.
+        """
+        by_question = {}
+        for q_id, h in requested:
+            by_question.setdefault(q_id, {})[f"usedHelp{h}"] = True
+        updated = {}
+        for q_id, fields in by_question.items():
+            update = {"$set": dict(fields, timestamp=when)}
+            pending = [ev for ev in events if ev["question_id"] == q_id]
+            if pending:
+                update["$push"] = {"pendingEvents": {"$each": pending}}
+            updated[q_id] = self.col.find_one_and_update(
+                {"user_id": user_id, "question_id": q_id}, update, projection=self.projection,
+                upsert=True, return_document=ReturnDocument.AFTER
+            )
+        return updated
+
+
+class MongoSummaries(MongoCollection):
+    name = "answer_summaries"
+
+    def ensure_index(self):
+        """
+        Índice único (user_id, question_id). `fold` depende de él para no
+        insertar un segundo resumen al reaplicar un lote; create_index no hace
+        nada si ya existe.
+        """
+        self.col.create_index([("user_id", 1), ("question_id", 1)], unique=True)
+
+    def for_user(self, user_id=None, course_id=None):
+        query = self._course_query(course_id)
+        if user_id is not None:
+            query["user_id"] = user_id
+        return self.col.find(query)
+
+    def fold(self, user_id, question_id, attempts, correct_attempts, exp_awarded,
+             first_attempt_at, last_attempt_at, first_correct_at, when, course_id=None,
+             batch_id=None):
+        """
+        Suma un lote de intentos al resumen. Con `batch_id` es idempotente: si
+        el resumen ya tiene ese lote aplicado (lastBatch) no se vuelve a sumar.
+        """
+        update = {
+            "$inc": {
+                "attempts": attempts,
+                "correctAttempts": correct_attempts,
+                "expAwarded": exp_awarded,
+            },
+            "$min": {"firstAttemptAt": first_attempt_at},
+            "$max": {"lastAttemptAt": last_attempt_at},
+            "$set": {"compactedAt": when, "course_id": course_id, "lastBatch": batch_id},
+        }
+        if first_correct_at:
+            update["$min"]["firstCorrectAt"] = first_correct_at
+        query = {"user_id": user_id, "question_id": question_id}
+        if batch_id is not None:
+            query["lastBatch"] = {"$ne": batch_id}
+        try:
+            self.col.update_one(query, update, upsert=True)
+        except DuplicateKeyError:
+            # El resumen existe y ya tiene este lote: el upsert chocó con el índice único
+            pass
+
+
+class MongoWatermarks(MongoCollection):
+    name = "export_watermarks"
+
+    def set(self, name, fields):
+        self.col.update_one({"_id": name}, {"$set": fields}, upsert=True)
+
+
+class MongoCompactions(MongoWatermarks):
+    """Lote de compactación en curso, para retomarlo si la corrida se corta."""
+    name = "compaction_log"
+
+
+class MongoJobs(MongoCollection):
+    name = "jobs"
+
+    def register(self, name, schedule, next_run_at):
+        self.col.update_one(
+            {"_id": name},
+            {"$set": {"schedule": schedule}, "$setOnInsert": {"nextRunAt": next_run_at, "lockedUntil": None}},
+            upsert=True
+        )
+
+    def acquire(self, name, owner, now, lease_until):
+        """
+        Toma el lock del job si le toca correr y nadie lo tiene (o venció).
+        Es una sola operación atómica, así que entre varios workers de gunicorn
+        solo uno lo obtiene. Devuelve el documento o None.
+        """
+        return self.col.find_one_and_update(
+            {
+                "_id": name,
+                "nextRunAt": {"$lte": now},
+                "$or": [{"lockedUntil": None}, {"lockedUntil": {"$lt": now}}],
+            },
+            {"$set": {"lockedBy": owner, "lockedUntil": lease_until, "startedAt": now}},
+            return_document=ReturnDocument.AFTER
+        )
+
+    def renew(self, name, owner, lease_until):
+        """Extiende el lock mientras el job sigue corriendo. False si ya no es de `owner`."""
+        return self.col.update_one(
+            {"_id": name, "lockedBy": owner}, {"$set": {"lockedUntil": lease_until}}
+        ).matched_count > 0
+
+    def release(self, name, owner, fields, next_run_at, due_at):
+        """
+        Suelta el lock y programa la próxima corrida. Si nextRunAt ya no es
+        `due_at` (el que tenía al tomarlo) es que pidieron otra corrida mientras
+        corría (request_run): esa se respeta.
+        """
+        self.col.update_one(
+            {"_id": name, "lockedBy": owner, "nextRunAt": due_at},
+            {"$set": {"nextRunAt": next_run_at}}
+        )
+        self.col.update_one(
+            {"_id": name, "lockedBy": owner},
+            {"$set": dict(fields, lockedBy=None, lockedUntil=None)}
+        )
+
+    def request_run(self, name, now):
+        return self.col.update_one({"_id": name}, {"$set": {"nextRunAt": now}}).matched_count > 0
+
+
+class MongoSnapshots(MongoCollection):
+    """
+    Fotos precalculadas: la cabecera en `snapshots` y cada fila en un documento
+    de `snapshot_rows` (el informe completo supera los 16 MB de un documento BSON).
+    """
+    name = "snapshots"
+    rows_batch = 500
+
+    def __init__(self, db):
+        super().__init__(db)
+        self.rows_col = db["snapshot_rows"]
+
+    def put(self, name, rows, generated_at):
+        """
+        Guarda las filas (un iterable, no hace falta tenerlas en memoria) como
+        una generación nueva y recién al final cambia la cabecera. Se conserva
+        la generación anterior para los que la estén leyendo en ese momento.
+        """
+        generation = ObjectId()
+        count, batch = 0, []
+        for row in rows:
+            batch.append({"snapshot": name, "generation": generation, "pos": count, "data": row})
+            count += 1
+            if len(batch) >= self.rows_batch:
+                self.rows_col.insert_many(batch)
+                batch = []
+        if batch:
+            self.rows_col.insert_many(batch)
+        previous = self.col.find_one_and_replace(
+            {"_id": name},
+            {"_id": name, "generation": generation, "rows": count, "generatedAt": generated_at},
+            upsert=True
+        )
+        keep = [generation]
+        if previous and previous.get("generation"):
+            keep.append(previous["generation"])
+        self.rows_col.delete_many({"snapshot": name, "generation": {"$nin": keep}})
+
+    def rows(self, snapshot):
+        """Filas de la foto (la cabecera que devuelve `get`), en orden."""
+        if "generation" not in snapshot:
+            # Fotos guardadas por versiones anteriores, con las filas en la cabecera
+            return iter(snapshot.get("data", []))
+        cursor = self.rows_col.find(
+            {"snapshot": snapshot["_id"], "generation": snapshot["generation"]}
+        ).sort("pos", 1)
+        return (r["data"] for r in cursor)
+
+
+class MongoEvents(MongoCollection):
+    name = "answer_events"
+
+    def __init__(self, db):
+        super().__init__(db)
+        self.counters = db["counters"]
+
+    @property
+    def commits_in_order(self):
+        """
+        Si los eventos se confirman en el orden de su secuencia. Con
+        transacciones (replica set o sharding) sí: ver append. Un mongod
+        suelto, como el de desarrollo, no tiene transacciones.
+        """
+        topology = self.col.database.client.topology_description.topology_type_name
+        return topology in ("ReplicaSetWithPrimary", "Sharded", "LoadBalanced")
+
+    def append(self, events):
+        """
+        Agrega los eventos al log con números de secuencia crecientes. El
+        bloque de números se reserva de una vez en `counters`, así que un
+        lote de N eventos es un solo incremento y un solo insert. Los eventos
+        cuya `key` ya está en el log se ignoran, así que reenviar un lote es
+        seguro; solo deja huecos en la secuencia.
+
+        Reserva e insert van en una transacción: dos appends concurrentes
+        chocan en el documento de `counters`, así que el segundo espera a
+        que el primero confirme. Un evento nunca es visible antes que otro
+        de secuencia menor, sin depender de cuánto tarde cada escritura.
+        """
+        if not events:
+            return
+        if not self.commits_in_order:
+            self._append(events)
+            return
+        with self.col.database.client.start_session() as session:
+            session.with_transaction(lambda s: self._append(events, s))
+
+    def _append(self, events, session=None):
+        keys = [ev["key"] for ev in events]
+        logged = {d["key"] for d in self.col.find({"key": {"$in": keys}}, {"key": 1}, session=session)}
+        events = [ev for ev in events if ev["key"] not in logged]
+        if not events:
+            return
+        counter = self.counters.find_one_and_update(
+            {"_id": self.name}, {"$inc": {"seq": len(events)}},
+            upsert=True, return_document=ReturnDocument.AFTER, session=session
+        )
+        first = counter["seq"] - len(events) + 1
+        logged_at = datetime.utcnow()
+        docs = [dict(ev, _id=first + i, loggedAt=logged_at) for i, ev in enumerate(events)]
+        try:
+            self.col.insert_many(docs, ordered=False, session=session)
+        except BulkWriteError as e:
+            # Sin transacción otro relay pudo pasar la misma key en el medio
+            if session or any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+                raise
+
+    def after(self, seq, limit, types=None, course_id=None):
+        """Eventos con secuencia mayor a `seq`, en orden."""
+        query = dict(self._course_query(course_id), _id={"$gt": seq})
+        if types:
+            query["type"] = {"$in": list(types)}
+        return list(self.col.find(query).sort("_id", 1).limit(limit))
+
+    def last_seq(self):
+        counter = self.counters.find_one({"_id": self.name})
+        return counter["seq"] if counter else 0
+
+    def delete_before(self, when):
+        return self.col.delete_many({"at": {"$lt": when}}).deleted_count
+
+
+class MongoRepos:
+    def __init__(self, db):
+        self.users = MongoUsers(db)
+        self.units = MongoUnits(db)
+        self.questions = MongoQuestions(db)
+        self.answers = MongoAnswers(db)
+        self.helps = MongoHelps(db)
+        self.summaries = MongoSummaries(db)
+        self.watermarks = MongoWatermarks(db)
+        self.compactions = MongoCompactions(db)
+        self.jobs = MongoJobs(db)
+        self.snapshots = MongoSnapshots(db)
+        self.events = MongoEvents(db)
+        self.db = db
+
+    def ensure_indexes(self):
+        self.db.users.create_index([("DNI", 1)])
+        self.db.users.create_index([("courses", 1)])
+        self.db.units.create_index([("course_id", 1)])
+        self.db.question_helps.create_index([("user_id", 1), ("question_id", 1)], unique=True)
+        self.db.questions.create_index([("unit_id", 1)])
+        self.db.questions.create_index([("course_id", 1)])
+        self.db.answers.create_index([("user_id", 1), ("question_id", 1)])
+        self.db.answers.create_index([("course_id", 1), ("user_id", 1)])
+        self.summaries.ensure_index()
+        self.db.answer_summaries.create_index([("course_id", 1), ("user_id", 1)])
+        self.db.snapshot_rows.create_index([("snapshot", 1), ("generation", 1), ("pos", 1)])
+        self.db.answer_events.create_index([("at", 1)])
+        # Exportación incremental: orden (marca de cambio, _id)
+        self.db.question_helps.create_index([("timestamp", 1), ("_id", 1)])
+        for name in ("users", "questions", "answers"):
+            # Documentos anteriores a `updatedAt`: se toma la fecha de creación del _id
+            self.db[name].update_many(
+                {"updatedAt": {"$exists": False}},
+                [{"$set": {"updatedAt": {"$toDate": "$_id"}}}]
+            )
+            self.db[name].create_index([("updatedAt", 1), ("_id", 1)])
+        self.db.answer_events.create_index([("course_id", 1), ("_id", 1)])
+        self.db.answer_events.create_index([("key", 1)], unique=True)
+        # Eventos pendientes de pasar al log (ver MongoOutbox)
+        self.db.answers.create_index([("pendingEvents.key", 1)], sparse=True)
+        self.db.question_helps.create_index([("pendingEvents.key", 1)], sparse=True)
+
+
+class MongoStorage:
+    def __init__(self):
+        self._repos = {}
+
+    def repos(self, policy=None):
+        db = read_db(policy)
+        key = id(db)
+        if key not in self._repos:
+            self._repos[key] = MongoRepos(db)
+        return self._repos[key]
@@ -0,0 +1,762 @@
+# Implementación SQLite (embebida, en el mismo proceso) de los repositorios.
+#
+# Cada colección es una tabla con el documento completo serializado con
+# bson.json_util (conserva ObjectId y fechas) y columnas indexadas con los
+# campos por los que se consulta. Los _id siguen siendo ObjectId, guardados en
+# hexadecimal: así el orden por id es el mismo orden de creación que en Mongo.
+import sqlite3
+import threading
+from datetime import datetime
+from bson import ObjectId, json_util
+from repositories import NO_COURSE
+
+# Filas por página de los listados (ver SqliteTable._select)
+PAGE_SIZE = 500
+
+
+def _key(value):
+    if value is None:
+        return None
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        # Misma precisión que BSON (milisegundos) y ancho fijo para comparar como texto
+        return value.replace(microsecond=value.microsecond // 1000 * 1000).strftime("%Y-%m-%dT%H:%M:%S.%f")
+    return str(value)
+
+
+class SqliteTable:
+    """Operaciones comunes sobre una tabla de documentos."""
+    name = None
+    # columna -> función que extrae el valor indexado del documento
+    columns = {}
+    indexes = []
+    # columnas del orden de `scan` (la última siempre es id)
+    scan_columns = ("id",)
+    # columna con el curso del documento (None si la tabla no tiene curso)
+    course_column = None
+    # si cada escritura marca `updatedAt` (lo usa la exportación incremental)
+    tracks_updates = False
+    # campos del documento que no se devuelven en las lecturas
+    hidden_fields = ()
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    # -- helpers --
+    def _row_values(self, doc):
+        return [_key(doc["_id"])] + [_key(get(doc)) for get in self.columns.values()] + [json_util.dumps(doc)]
+
+    def _load(self, text):
+        doc = json_util.loads(text)
+        for field in self.hidden_fields:
+            doc.pop(field, None)
+        return doc
+
+    def _write(self, conn, doc, touch=True):
+        if self.tracks_updates and touch:
+            doc["updatedAt"] = datetime.utcnow()
+        cols = ["id"] + list(self.columns) + ["doc"]
+        conn.execute(
+            f"INSERT OR REPLACE INTO {self.name} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+            self._row_values(doc)
+        )
+
+    def _select(self, where="", params=(), suffix=""):
+        """
+        Documentos que cumplen `where`, ordenados por id. Sin `suffix` devuelve
+        un generador que lee de a PAGE_SIZE filas (keyset sobre id), como un
+        cursor de Mongo: los listados grandes nunca quedan enteros en memoria.
+        Con `suffix` (ORDER/LIMIT propios) devuelve la lista.
+        """
+        if not suffix:
+            return self._pages(where, params)
+        sql = f"SELECT doc FROM {self.name}"
+        if where:
+            sql += f" WHERE {where}"
+        rows = self.storage.query(sql + suffix, params)
+        return [self._load(r[0]) for r in rows]
+
+    def _pages(self, where, params):
+        condition = f"({where}) AND " if where else ""
+        last = ""
+        while True:
+            rows = self.storage.query(
+                f"SELECT id, doc FROM {self.name} WHERE {condition}id > ? ORDER BY id LIMIT ?",
+                tuple(params) + (last, PAGE_SIZE)
+            )
+            for _, doc in rows:
+                yield self._load(doc)
+            if len(rows) < PAGE_SIZE:
+                return
+            last = rows[-1][0]
+
+    def _one(self, where, params):
+        docs = self._select(where, params, " LIMIT 1")
+        return docs[0] if docs else None
+
+    def schema(self):
+        cols = ", ".join(f"{c} TEXT" for c in self.columns)
+        stmts = [
+            f"CREATE TABLE IF NOT EXISTS {self.name} "
+            f"(id TEXT PRIMARY KEY{', ' + cols if cols else ''}, doc TEXT NOT NULL)"
+        ]
+        for idx_cols, unique in self.indexes:
+            stmts.append(
+                f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS "
+                f"ix_{self.name}_{'_'.join(idx_cols)} ON {self.name} ({', '.join(idx_cols)})"
+            )
+        return stmts
+
+    def _course_filter(self, course_id):
+        if course_id == NO_COURSE:
+            return f"{self.course_column} IS NULL", ()
+        return f"{self.course_column} = ?", (course_id,)
+
+    def upgrade(self, conn, existing):
+        """Migración de bases anteriores; `existing` son las columnas que ya tenía la tabla."""
+
+    # -- API común --
+    def all(self, course_id=None):
+        """Todos los documentos, o solo los del curso indicado."""
+        if course_id is None or self.course_column is None:
+            return self._select()
+        return self._select(*self._course_filter(course_id))
+
+    def get(self, doc_id):
+        return self._one("id = ?", (_key(doc_id),))
+
+    def by_ids(self, ids):
+        keys = [_key(i) for i in ids]
+        if not keys:
+            return []
+        return self._select(f"id IN ({', '.join('?' * len(keys))})", keys)
+
+    def create(self, doc):
+        doc = dict(doc)
+        doc.setdefault("_id", ObjectId())
+        with self.storage.transaction() as conn:
+            self._write(conn, doc)
+        return doc["_id"]
+
+    def update(self, doc_id, fields):
+        with self.storage.transaction() as conn:
+            row = conn.execute(f"SELECT doc FROM {self.name} WHERE id = ?", (_key(doc_id),)).fetchone()
+            if not row:
+                return False
+            doc = json_util.loads(row[0])
+            doc.update(fields)
+            self._write(conn, doc)
+        return True
+
+    def delete(self, doc_id):
+        with self.storage.transaction() as conn:
+            cur = conn.execute(f"DELETE FROM {self.name} WHERE id = ?", (_key(doc_id),))
+        return cur.rowcount > 0
+
+    def scan(self, after=None, batch_size=1000, until=None):
+        """
+        Recorre la tabla por páginas (keyset sobre `scan_columns`), así la
+        memoria usada no depende del tamaño de la tabla. `after` y `until`
+        como en MongoCollection.scan.
+        """
+        order = ", ".join(self.scan_columns)
+        sort_col = self.scan_columns[0]
+        bound, bound_params = "", ()
+        if until is not None:
+            bound, bound_params = f" AND {sort_col} < ?", (_key(until),)
+        last = None
+        if after is not None:
+            value, last_id = after
+            if sort_col == "id" or last_id is None:
+                where, params = f"{sort_col} {'>' if sort_col == 'id' else '>='} ?", (_key(value),)
+            else:
+                last = (_key(value), _key(last_id))
+        else:
+            where, params = f"{sort_col} IS NOT NULL", ()
+        while True:
+            if last is not None:
+                where = f"({sort_col} > ? OR ({sort_col} = ? AND id > ?))"
+                params = (last[0], last[0], last[1])
+            rows = self.storage.query(
+                f"SELECT {sort_col}, id, doc FROM {self.name} WHERE {where}{bound} ORDER BY {order} LIMIT ?",
+                tuple(params) + bound_params + (batch_size,)
+            )
+            if not rows:
+                return
+            for row in rows:
+                yield self._load(row[2])
+            last = (rows[-1][0], rows[-1][1])
+
+
+class SqliteOutbox:
+    """
+    Tabla con eventos pendientes embebidos en sus documentos (ver
+    repositories.mongo.MongoOutbox); la columna `pending` los indexa.
+    """
+    hidden_fields = ("pendingEvents",)
+
+    def with_pending(self, limit=100, ids=None):
+        where, params = "pending IS NOT NULL", []
+        if ids is not None:
+            keys = [_key(i) for i in ids]
+            if not keys:
+                return []
+            where += f" AND id IN ({', '.join('?' * len(keys))})"
+            params.extend(keys)
+        rows = self.storage.query(
+            f"SELECT doc FROM {self.name} WHERE {where} ORDER BY id LIMIT ?", params + [int(limit)]
+        )
+        return [json_util.loads(r[0]) for r in rows]
+
+    def clear_pending(self, doc_id, keys):
+        keys = set(keys)
+        with self.storage.transaction() as conn:
+            row = conn.execute(f"SELECT doc FROM {self.name} WHERE id = ?", (_key(doc_id),)).fetchone()
+            if not row:
+                return
+            doc = json_util.loads(row[0])
+            doc["pendingEvents"] = [ev for ev in doc.get("pendingEvents", []) if ev.get("key") not in keys]
+            if not doc["pendingEvents"]:
+                del doc["pendingEvents"]
+            # No es un cambio del documento: no toca updatedAt
+            self._write(conn, doc, touch=False)
+
+
+def _pending(doc):
+    return "1" if doc.get("pendingEvents") else None
+
+
+class SqliteUsers(SqliteTable):
+    name = "users"
+    columns = {
+        "dni": lambda d: d.get("DNI"),
+        "updated": lambda d: d.get("updatedAt"),
+    }
+    indexes = [(("dni",), False), (("updated", "id"), False)]
+    # Los cursos de cada usuario van en user_courses (una fila por curso)
+    course_column = "user_courses"
+    scan_columns = ("updated", "id")
+    tracks_updates = True
+
+    def schema(self):
+        return super().schema() + [
+            "CREATE TABLE IF NOT EXISTS user_courses "
+            "(user_id TEXT NOT NULL, course_id TEXT NOT NULL, PRIMARY KEY (user_id, course_id))",
+            "CREATE INDEX IF NOT EXISTS ix_user_courses_course_id ON user_courses (course_id, user_id)",
+        ]
+
+    def upgrade(self, conn, existing):
+        # Bases que guardaban los cursos como "|c1|c2|" en la columna courses
+        if "courses" not in existing:
+            return
+        for row_id, doc in conn.execute(
+            "SELECT id, doc FROM users WHERE courses IS NOT NULL "
+            "AND id NOT IN (SELECT user_id FROM user_courses)"
+        ).fetchall():
+            self._write_courses(conn, row_id, json_util.loads(doc))
+
+    def _write_courses(self, conn, user_key, doc):
+        conn.execute("DELETE FROM user_courses WHERE user_id = ?", (user_key,))
+        conn.executemany(
+            "INSERT OR IGNORE INTO user_courses (user_id, course_id) VALUES (?, ?)",
+            [(user_key, course) for course in doc.get("courses") or []]
+        )
+
+    def _write(self, conn, doc, touch=True):
+        super()._write(conn, doc, touch)
+        self._write_courses(conn, _key(doc["_id"]), doc)
+
+    def _course_filter(self, course_id):
+        if course_id == NO_COURSE:
+            return "id NOT IN (SELECT user_id FROM user_courses)", ()
+        return "id IN (SELECT user_id FROM user_courses WHERE course_id = ?)", (course_id,)
+
+    def delete(self, doc_id):
+        with self.storage.transaction() as conn:
+            conn.execute("DELETE FROM user_courses WHERE user_id = ?", (_key(doc_id),))
+            cur = conn.execute("DELETE FROM users WHERE id = ?", (_key(doc_id),))
+        return cur.rowcount > 0
+
+    def by_dni(self, dni, fields=None):
+        return self._one("dni = ?", (_key(dni),))
+
+    def set_password(self, dni, hashed):
+        user = self.by_dni(dni)
+        if user:
+            self.update(user["_id"], {"password": hashed})
+
+    def add_exp(self, user_id, amount):
+        with self.storage.transaction() as conn:
+            row = conn.execute("SELECT doc FROM users WHERE id = ?", (_key(user_id),)).fetchone()
+            if row:
+                doc = json_util.loads(row[0])
+                doc["exp"] = doc.get("exp", 0) + amount
+                self._write(conn, doc)
+
+
+class SqliteUnits(SqliteTable):
+    name = "units"
+    columns = {"course_id": lambda d: d.get("course_id")}
+    indexes = [(("course_id",), False)]
+    course_column = "course_id"
+
+    def course_ids(self):
+        rows = self.storage.query("SELECT DISTINCT course_id FROM units WHERE course_id IS NOT NULL")
+        return [r[0] for r in rows]
+
+
+class SqliteQuestions(SqliteTable):
+    name = "questions"
+    columns = {
+        "unit_id": lambda d: d.get("unit_id"),
+        "course_id": lambda d: d.get("course_id"),
+        "updated": lambda d: d.get("updatedAt"),
+    }
+    indexes = [(("unit_id",), False), (("course_id",), False), (("updated", "id"), False)]
+    course_column = "course_id"
+    scan_columns = ("updated", "id")
+    tracks_updates = True
+
+    def by_unit(self, unit_id):
+        return self._select("unit_id = ?", (_key(unit_id),))
+
+    def ids_by_unit(self, unit_id):
+        rows = self.storage.query("SELECT id FROM questions WHERE unit_id = ? ORDER BY id", (_key(unit_id),))
+        return [ObjectId(r[0]) for r in rows]
+
+
+class SqliteAnswers(SqliteOutbox, SqliteTable):
+    name = "answers"
+    columns = {
+        "user_id": lambda d: d.get("user_id"),
+        "question_id": lambda d: d.get("question_id"),
+        "course_id": lambda d: d.get("course_id"),
+        "updated": lambda d: d.get("updatedAt"),
+        "pending": _pending,
+    }
+    indexes = [
+        (("user_id", "question_id"), False), (("question_id",), False),
+        (("course_id", "user_id"), False), (("updated", "id"), False), (("pending",), False),
+    ]
+    course_column = "course_id"
+    scan_columns = ("updated", "id")
+    tracks_updates = True
+
+    def find(self, user_id=None, question_id=None, question_ids=None, course_id=None):
+        where, params = [], []
+        if course_id is not None:
+            clause, clause_params = self._course_filter(course_id)
+            where.append(clause)
+            params.extend(clause_params)
+        if user_id is not None:
+            where.append("user_id = ?")
+            params.append(_key(user_id))
+        if question_id is not None:
+            where.append("question_id = ?")
+            params.append(_key(question_id))
+        elif question_ids is not None:
+            keys = [_key(q) for q in question_ids]
+            if not keys:
+                return []
+            where.append(f"question_id IN ({', '.join('?' * len(keys))})")
+            params.extend(keys)
+        return self._select(" AND ".join(where), params)
+
+    def created_before(self, before_id, limit):
+        return self._select("id < ?", (_key(before_id),), f" ORDER BY id LIMIT {int(limit)}")
+
+    def delete_many(self, ids):
+        keys = [_key(i) for i in ids]
+        if not keys:
+            return 0
+        with self.storage.transaction() as conn:
+            cur = conn.execute(f"DELETE FROM answers WHERE id IN ({', '.join('?' * len(keys))})", keys)
+        return cur.rowcount
+
+
+class SqliteHelps(SqliteOutbox, SqliteTable):
+    name = "question_helps"
+    columns = {
+        "user_id": lambda d: d.get("user_id"),
+        "question_id": lambda d: d.get("question_id"),
+        "ts": lambda d: d.get("timestamp"),
+        "pending": _pending,
+    }
+    indexes = [(("user_id", "question_id"), True), (("ts", "id"), False), (("pending",), False)]
+    scan_columns = ("ts", "id")
+
+    def get_for(self, user_id, question_id):
+        return self._one("user_id = ? AND question_id = ?", (_key(user_id), _key(question_id)))
+
+    def for_user(self, user_id, question_ids):
+        keys = [_key(q) for q in question_ids]
+        if not keys:
+            return []
+        return self._select(
+            f"user_id = ? AND question_id IN ({', '.join('?' * len(keys))})",
+            [_key(user_id)] + keys
+        )
+
+    def mark_used(self, user_id, requested, when, events=()):
+        docs = {}
+        with self.storage.transaction() as conn:
+            for q_id, h in requested:
+                row = conn.execute(
+                    "SELECT doc FROM question_helps WHERE user_id = ? AND question_id = ?",
+                    (_key(user_id), _key(q_id))
+                ).fetchone()
+                doc = json_util.loads(row[0]) if row else {
+                    "_id": ObjectId(), "user_id": user_id, "question_id": q_id
+                }
+                doc[f"usedHelp{h}"] = True
+                doc["timestamp"] = when
+                pending = [ev for ev in events if ev["question_id"] == q_id]
+                if q_id not in docs and pending:
+                    doc.setdefault("pendingEvents", []).extend(pending)
+                self._write(conn, doc)
+                docs[q_id] = doc
+        return {q_id: {k: v for k, v in doc.items() if k not in self.hidden_fields} for q_id, doc in docs.items()}
+
+
+class SqliteSummaries(SqliteTable):
+    name = "answer_summaries"
+    columns = {
+        "user_id": lambda d: d.get("user_id"),
+        "question_id": lambda d: d.get("question_id"),
+        "course_id": lambda d: d.get("course_id"),
+    }
+    indexes = [(("user_id", "question_id"), True), (("course_id", "user_id"), False)]
+    course_column = "course_id"
+
+    def ensure_index(self):
+        # El índice único ya se crea con la tabla (ver SqliteRepos.ensure_indexes)
+        pass
+
+    def for_user(self, user_id=None, course_id=None):
+        where, params = [], []
+        if user_id is not None:
+            where.append("user_id = ?")
+            params.append(_key(user_id))
+        if course_id is not None:
+            clause, clause_params = self._course_filter(course_id)
+            where.append(clause)
+            params.extend(clause_params)
+        return self._select(" AND ".join(where), params)
+
+    def fold(self, user_id, question_id, attempts, correct_attempts, exp_awarded,
+             first_attempt_at, last_attempt_at, first_correct_at, when, course_id=None,
+             batch_id=None):
+        with self.storage.transaction() as conn:
+            row = conn.execute(
+                "SELECT doc FROM answer_summaries WHERE user_id = ? AND question_id = ?",
+                (_key(user_id), _key(question_id))
+            ).fetchone()
+            doc = json_util.loads(row[0]) if row else {
+                "_id": ObjectId(), "user_id": user_id, "question_id": question_id,
+                "attempts": 0, "correctAttempts": 0, "expAwarded": 0,
+            }
+            if batch_id is not None and doc.get("lastBatch") == batch_id:
+                return
+            doc["attempts"] += attempts
+            doc["correctAttempts"] += correct_attempts
+            doc["expAwarded"] += exp_awarded
+            doc["firstAttemptAt"] = min(filter(None, [doc.get("firstAttemptAt"), first_attempt_at]))
+            doc["lastAttemptAt"] = max(filter(None, [doc.get("lastAttemptAt"), last_attempt_at]))
+            if first_correct_at:
+                doc["firstCorrectAt"] = min(filter(None, [doc.get("firstCorrectAt"), first_correct_at]))
+            doc["compactedAt"] = when
+            doc["course_id"] = course_id
+            doc["lastBatch"] = batch_id
+            self._write(conn, doc)
+
+
+class SqliteWatermarks(SqliteTable):
+    name = "export_watermarks"
+
+    def set(self, name, fields):
+        with self.storage.transaction() as conn:
+            row = conn.execute(f"SELECT doc FROM {self.name} WHERE id = ?", (name,)).fetchone()
+            doc = json_util.loads(row[0]) if row else {"_id": name}
+            doc.update(fields)
+            self._write(conn, doc)
+
+
+class SqliteCompactions(SqliteWatermarks):
+    """Lote de compactación en curso, para retomarlo si la corrida se corta."""
+    name = "compaction_log"
+
+
+class SqliteJobs(SqliteTable):
+    name = "jobs"
+
+    def register(self, name, schedule, next_run_at):
+        with self.storage.transaction() as conn:
+            row = conn.execute("SELECT doc FROM jobs WHERE id = ?", (name,)).fetchone()
+            doc = json_util.loads(row[0]) if row else {"_id": name, "nextRunAt": next_run_at, "lockedUntil": None}
+            doc["schedule"] = schedule
+            self._write(conn, doc)
+
+    def acquire(self, name, owner, now, lease_until):
+        # El motor embebido vive en un solo proceso: alcanza con la transacción
+        with self.storage.transaction() as conn:
+            row = conn.execute("SELECT doc FROM jobs WHERE id = ?", (name,)).fetchone()
+            if not row:
+                return None
+            doc = json_util.loads(row[0])
+            if doc.get("nextRunAt") and doc["nextRunAt"] > now:
+                return None
+            if doc.get("lockedUntil") and doc["lockedUntil"] >= now:
+                return None
+            doc.update(lockedBy=owner, lockedUntil=lease_until, startedAt=now)
+            self._write(conn, doc)
+        return doc
+
+    def renew(self, name, owner, lease_until):
+        with self.storage.transaction() as conn:
+            row = conn.execute("SELECT doc FROM jobs WHERE id = ?", (name,)).fetchone()
+            if not row:
+                return False
+            doc = json_util.loads(row[0])
+            if doc.get("lockedBy") != owner:
+                return False
+            doc["lockedUntil"] = lease_until
+            self._write(conn, doc)
+        return True
+
+    def release(self, name, owner, fields, next_run_at, due_at):
+        with self.storage.transaction() as conn:
+            row = conn.execute("SELECT doc FROM jobs WHERE id = ?", (name,)).fetchone()
+            if not row:
+                return
+            doc = json_util.loads(row[0])
+            if doc.get("lockedBy") != owner:
+                return
+            if doc.get("nextRunAt") == due_at:
+                doc["nextRunAt"] = next_run_at
+            doc.update(fields, lockedBy=None, lockedUntil=None)
+            self._write(conn, doc)
+
+    def request_run(self, name, now):
+        return self.update(name, {"nextRunAt": now})
+
+
+class SqliteSnapshotRows(SqliteTable):
+    name = "snapshot_rows"
+    # pos con ancho fijo para que el orden como texto sea el numérico
+    columns = {
+        "snapshot": lambda d: d.get("snapshot"),
+        "generation": lambda d: d.get("generation"),
+        "pos": lambda d: f"{d['pos']:010d}",
+    }
+    indexes = [(("snapshot", "generation", "pos"), False)]
+
+
+class SqliteSnapshots(SqliteTable):
+    """Cabecera de cada foto; las filas van en snapshot_rows (ver MongoSnapshots)."""
+    name = "snapshots"
+    rows_batch = 500
+
+    def __init__(self, storage):
+        super().__init__(storage)
+        self.rows_table = SqliteSnapshotRows(storage)
+
+    def _insert_rows(self, batch):
+        with self.storage.transaction() as conn:
+            for row in batch:
+                self.rows_table._write(conn, row)
+
+    def put(self, name, rows, generated_at):
+        generation = ObjectId()
+        count, batch = 0, []
+        for row in rows:
+            batch.append({"_id": ObjectId(), "snapshot": name, "generation": generation, "pos": count, "data": row})
+            count += 1
+            if len(batch) >= self.rows_batch:
+                self._insert_rows(batch)
+                batch = []
+        self._insert_rows(batch)
+        with self.storage.transaction() as conn:
+            row = conn.execute("SELECT doc FROM snapshots WHERE id = ?", (name,)).fetchone()
+            previous = json_util.loads(row[0]) if row else {}
+            self._write(conn, {"_id": name, "generation": generation, "rows": count, "generatedAt": generated_at})
+            keep = [_key(generation), _key(previous.get("generation"))]
+            conn.execute(
+                "DELETE FROM snapshot_rows WHERE snapshot = ? AND generation NOT IN (?, ?)",
+                [name] + [k or "" for k in keep]
+            )
+
+    def rows(self, snapshot):
+        if "generation" not in snapshot:
+            return iter(snapshot.get("data", []))
+        return self._iter_rows(snapshot["_id"], _key(snapshot["generation"]))
+
+    def _iter_rows(self, name, generation):
+        last = ""
+        while True:
+            rows = self.storage.query(
+                "SELECT pos, doc FROM snapshot_rows WHERE snapshot = ? AND generation = ? AND pos > ? "
+                "ORDER BY pos LIMIT ?",
+                (name, generation, last, self.rows_batch)
+            )
+            if not rows:
+                return
+            for _, doc in rows:
+                yield json_util.loads(doc)["data"]
+            last = rows[-1][0]
+
+
+class SqliteEvents(SqliteTable):
+    """
+    Log de eventos: la secuencia es la clave INTEGER AUTOINCREMENT de SQLite
+    (nunca se reutiliza, ni siquiera después de borrar los más viejos).
+    """
+    name = "answer_events"
+    columns = {
+        "type": lambda d: d.get("type"),
+        "course_id": lambda d: d.get("course_id"),
+        "at": lambda d: d.get("at"),
+        "key": lambda d: d.get("key"),
+    }
+    indexes = [(("at",), False), (("course_id", "seq"), False), (("key",), True)]
+    course_column = "course_id"
+    # Las escrituras se serializan (ver SqliteStorage): se confirman en orden
+    commits_in_order = True
+
+    def schema(self):
+        cols = ", ".join(f"{c} TEXT" for c in self.columns)
+        stmts = super().schema()
+        stmts[0] = (
+            f"CREATE TABLE IF NOT EXISTS {self.name} "
+            f"(seq INTEGER PRIMARY KEY AUTOINCREMENT, {cols}, doc TEXT NOT NULL)"
+        )
+        return stmts
+
+    def append(self, events):
+        """Como MongoEvents.append: las `key` repetidas se ignoran."""
+        logged_at = datetime.utcnow()
+        placeholders = ", ".join("?" * (len(self.columns) + 1))
+        with self.storage.transaction() as conn:
+            for ev in events:
+                ev = dict(ev, loggedAt=logged_at)
+                conn.execute(
+                    f"INSERT OR IGNORE INTO {self.name} ({', '.join(self.columns)}, doc) VALUES ({placeholders})",
+                    [_key(get(ev)) for get in self.columns.values()] + [json_util.dumps(ev)]
+                )
+
+    def after(self, seq, limit, types=None, course_id=None):
+        where, params = ["seq > ?"], [int(seq)]
+        if types:
+            types = list(types)
+            where.append(f"type IN ({', '.join('?' * len(types))})")
+            params.extend(types)
+        if course_id is not None:
+            clause, clause_params = self._course_filter(course_id)
+            where.append(clause)
+            params.extend(clause_params)
+        rows = self.storage.query(
+            f"SELECT seq, doc FROM {self.name} WHERE {' AND '.join(where)} ORDER BY seq LIMIT ?",
+            params + [int(limit)]
+        )
+        return [dict(json_util.loads(doc), _id=seq) for seq, doc in rows]
+
+    def last_seq(self):
+        row = self.storage.query("SELECT seq FROM sqlite_sequence WHERE name = ?", (self.name,))
+        return row[0][0] if row else 0
+
+    def delete_before(self, when):
+        with self.storage.transaction() as conn:
+            cur = conn.execute(f"DELETE FROM {self.name} WHERE at < ?", (_key(when),))
+        return cur.rowcount
+
+
+class SqliteRepos:
+    def __init__(self, storage):
+        self.users = SqliteUsers(storage)
+        self.units = SqliteUnits(storage)
+        self.questions = SqliteQuestions(storage)
+        self.answers = SqliteAnswers(storage)
+        self.helps = SqliteHelps(storage)
+        self.summaries = SqliteSummaries(storage)
+        self.watermarks = SqliteWatermarks(storage)
+        self.compactions = SqliteCompactions(storage)
+        self.jobs = SqliteJobs(storage)
+        self.snapshots = SqliteSnapshots(storage)
+        self.events = SqliteEvents(storage)
+        self.storage = storage
+
+    def tables(self):
+        return [self.users, self.units, self.questions, self.answers,
+                self.helps, self.summaries, self.watermarks, self.compactions, self.jobs,
+                self.snapshots, self.snapshots.rows_table, self.events]
+
+    def ensure_indexes(self):
+        with self.storage.transaction() as conn:
+            for table in self.tables():
+                create_table, *create_indexes = table.schema()
+                conn.execute(create_table)
+                # Bases creadas con una versión anterior: agrego las columnas nuevas
+                existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table.name})")}
+                for col in table.columns:
+                    if col not in existing:
+                        conn.execute(f"ALTER TABLE {table.name} ADD COLUMN {col} TEXT")
+                        # Completo la columna nueva desde el documento guardado
+                        for row_id, doc in conn.execute(f"SELECT id, doc FROM {table.name}").fetchall():
+                            conn.execute(
+                                f"UPDATE {table.name} SET {col} = ? WHERE id = ?",
+                                (_key(table.columns[col](json_util.loads(doc))), row_id)
+                            )
+                if table.tracks_updates:
+                    # Documentos anteriores a `updatedAt`: se toma la fecha de creación del _id
+                    for row_id, doc in conn.execute(
+                        f"SELECT id, doc FROM {table.name} WHERE updated IS NULL"
+                    ).fetchall():
+                        doc = json_util.loads(doc)
+                        doc["updatedAt"] = ObjectId(row_id).generation_time.replace(tzinfo=None)
+                        conn.execute(
+                            f"UPDATE {table.name} SET updated = ?, doc = ? WHERE id = ?",
+                            (_key(doc["updatedAt"]), json_util.dumps(doc), row_id)
+                        )
+                for stmt in create_indexes:
+                    conn.execute(stmt)
+                table.upgrade(conn, existing)
+
+
+class SqliteStorage:
+    """Una conexión compartida por el proceso; las escrituras se serializan con un lock."""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.lock = threading.RLock()
+        if path != ":memory:":
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._repos = SqliteRepos(self)
+        self._repos.ensure_indexes()
+
+    def repos(self, policy=None):
+        return self._repos
+
+    def query(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def transaction(self):
+        return _Transaction(self)
+
+
+class _Transaction:
+    def __init__(self, storage):
+        self.storage = storage
+
+    def __enter__(self):
+        self.storage.lock.acquire()
+        self.storage.conn.execute("BEGIN IMMEDIATE")
+        return self.storage.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.storage.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.storage.lock.release()
+        return False
@@ -0,0 +1,117 @@
+# Fixtures de las pruebas del backend.
+#
+# Se corren desde back/ con:
+#   python -m pytest -q tests
+#
+# test_repositories.py es el contrato de los repositorios y corre contra los
+# dos motores: SQLite en memoria siempre, y MongoDB solo si hay MONGO_URI (usa
+# la base MONGO_TEST_DB, que se borra antes y después de cada test). El resto
+# de los archivos prueba el comportamiento de cada funcionalidad sobre la app
+# con una base SQLite en memoria nueva por test.
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault("STORAGE_ENGINE", "sqlite")
+os.environ.setdefault("SQLITE_PATH", ":memory:")
+os.environ.setdefault("SECRET_KEY", "tests-" + "x" * 32)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from werkzeug.security import generate_password_hash
+from app import app as flask_app
+from repositories.sqlite import SqliteStorage
+
+MONGO_URI = os.getenv("MONGO_URI")
+MONGO_TEST_DB = os.getenv("MONGO_TEST_DB", "trp_tests")
+# Origen permitido por CORS (ver app.py)
+HEADERS = {"Origin": "http://localhost:3000"}
+
+
+@pytest.fixture(params=["sqlite", "mongo"])
+def repos(request):
+    """Repositorios de cada motor, vacíos."""
+    if request.param == "sqlite":
+        yield SqliteStorage(":memory:").repos()
+        return
+    if not MONGO_URI:
+        pytest.skip("MONGO_URI no está definido")
+    from pymongo import MongoClient
+    from repositories.mongo import MongoRepos
+    client = MongoClient(MONGO_URI)
+    client.drop_database(MONGO_TEST_DB)
+    mongo_repos = MongoRepos(client[MONGO_TEST_DB])
+    mongo_repos.ensure_indexes()
+    try:
+        yield mongo_repos
+    finally:
+        client.drop_database(MONGO_TEST_DB)
+        client.close()
+
+
+@pytest.fixture
+def app(tmp_path):
+    """La app con una base SQLite en memoria nueva y carpetas temporales."""
+    saved = dict(flask_app.config)
+    flask_app.config.update(
+        TESTING=True,
+        MAIL_SUPPRESS_SEND=True,
+        ANSWERS_ARCHIVE_DIR=str(tmp_path / "archive"),
+        EXPORT_DIR=str(tmp_path / "export"),
+        EVENTS_SETTLE_MS=0,
+    )
+    flask_app.extensions["storage"] = SqliteStorage(":memory:")
+    try:
+        yield flask_app
+    finally:
+        flask_app.config.clear()
+        flask_app.config.update(saved)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def app_repos(app):
+    # Sin app context propio: cada request del client arma el suyo (y su `g`)
+    return app.extensions["storage"].repos()
+
+
+@pytest.fixture
+def login(client, app_repos):
+    """Crea un usuario y devuelve los headers con su token."""
+    def _login(dni, role="user", courses=()):
+        app_repos.users.create({
+            "DNI": dni, "name": dni, "lastname": dni, "email": f"{dni}@example.com",
+            "password": generate_password_hash("pw"), "role": role, "courses": list(courses), "exp": 0,
+        })
+        resp = client.post("/login", json={"DNI": dni, "password": "pw"}, headers=HEADERS)
+        return dict(HEADERS, Authorization=f"Bearer {resp.json['access_token']}")
+    return _login
+
+
+# -------------------------------
+# Datos de prueba vía la API
+# -------------------------------
+def make_unit(client, course=None, title="U"):
+    body = {"title": title, "level": 1}
+    if course:
+        body["course_id"] = course
+    return client.post("/units", json=body, headers=HEADERS).json["unit_id"]
+
+
+def make_open_question(client, unit_id, answer="si", exp=10, **extra):
+    body = {"type": "OpenEntry", "body": "?", "exp": exp, "unit_id": unit_id, "expectedAnswer": answer, **extra}
+    return client.post("/questions", json=body, headers=HEADERS).json["question_id"]
+
+
+def make_choice_question(client, unit_id, exp=20):
+    body = {"type": "Choice", "body": "?", "exp": exp, "unit_id": unit_id,
+            "options": [{"body": "0", "isCorrect": True}, {"body": "1", "isCorrect": False}]}
+    return client.post("/questions", json=body, headers=HEADERS).json["question_id"]
+
+
+def with_course(headers, course):
+    return dict(headers, **{"X-Course": course})
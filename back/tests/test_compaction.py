@@ -0,0 +1,90 @@
+# Compactación de respuestas: un lote cortado a mitad se retoma sin duplicar.
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+import compaction
+from events import answer_events
+
+
+def soon():
+    return datetime.utcnow() + timedelta(seconds=5)
+
+
+@pytest.fixture
+def answers(app, app_repos):
+    user_id = ObjectId()
+    q_id = app_repos.questions.create({"type": "OpenEntry", "exp": 10, "expectedAnswer": "si"})
+    for body in ("si", "no", "si"):
+        app_repos.answers.create({"user_id": user_id, "question_id": q_id, "body": body})
+    return user_id, q_id
+
+
+def test_compaction_moves_answers_to_summary_and_archive(app, app_repos, answers):
+    user_id, q_id = answers
+    with app.app_context():
+        assert compaction.compact_answers(before=soon()) == 3
+        archived = list(compaction.read_archive(user_id=user_id))
+    assert list(app_repos.answers.all()) == []
+    [summary] = app_repos.summaries.for_user(user_id)
+    assert (summary["attempts"], summary["correctAttempts"], summary["expAwarded"]) == (3, 2, 20)
+    assert [a["body"] for a in archived] == ["si", "no", "si"]
+    assert app_repos.compactions.get(compaction.LOG_NAME) is None
+
+
+def test_compaction_ensures_the_summary_index_first(app, app_repos, answers, monkeypatch):
+    calls = []
+    monkeypatch.setattr(app_repos.summaries, "ensure_index", lambda: calls.append("index"))
+    fold = app_repos.summaries.fold
+    monkeypatch.setattr(app_repos.summaries, "fold", lambda *a, **kw: calls.append("fold") or fold(*a, **kw))
+    with app.app_context():
+        compaction.compact_answers(before=soon())
+    assert calls[:2] == ["index", "fold"]
+
+
+@pytest.mark.parametrize("crash_stage", ["archive", "fold"])
+def test_interrupted_batch_is_resumed_once(app, app_repos, answers, monkeypatch, crash_stage):
+    user_id, _ = answers
+    fold = compaction._fold_batch
+
+    def fold_then_crash(*args):
+        fold(*args)
+        raise RuntimeError("corte")
+
+    monkeypatch.setattr(compaction, "_fold_batch", fold_then_crash)
+    with app.app_context():
+        with pytest.raises(RuntimeError):
+            compaction.compact_answers(before=soon())
+        monkeypatch.undo()
+        # "archive": como si el corte hubiera sido escribiendo el archivo
+        app_repos.compactions.set(compaction.LOG_NAME, {"stage": crash_stage})
+        assert compaction.compact_answers(before=soon()) == 3
+        archived = list(compaction.read_archive(user_id=user_id))
+
+    [summary] = app_repos.summaries.for_user(user_id)
+    assert (summary["attempts"], summary["expAwarded"]) == (3, 20)
+    assert len(archived) == 3
+    assert list(app_repos.answers.all()) == []
+
+
+def test_pending_events_are_relayed_before_deleting(app, app_repos, answers, monkeypatch):
+    user_id, q_id = answers
+    answer_id = ObjectId()
+    events = answer_events(answer_id, user_id, {"_id": q_id}, True, 10, datetime.utcnow())
+    app_repos.answers.create({"_id": answer_id, "user_id": user_id, "question_id": q_id,
+                              "body": "si", "pendingEvents": events})
+
+    monkeypatch.setattr(app_repos.events, "append", lambda events: 1 / 0)
+    with app.app_context():
+        with pytest.raises(RuntimeError):
+            compaction.compact_answers(before=soon())
+        # El lote quedó sin borrar: los eventos siguen pendientes
+        assert [a["_id"] for a in app_repos.answers.with_pending()] == [answer_id]
+        monkeypatch.undo()
+        assert compaction.compact_answers(before=soon()) == 4
+        archived = list(compaction.read_archive(user_id=user_id))
+
+    assert [ev["key"] for ev in app_repos.events.after(0, 10)] == [ev["key"] for ev in events]
+    assert len(archived) == 4
+    assert all("pendingEvents" not in a for a in archived)
@@ -0,0 +1,104 @@
+# Compresión negociada de las respuestas y streaming de listados.
+import gzip
+import json
+
+import pytest
+from flask import Response
+
+import compression
+from conftest import HEADERS, make_unit, make_open_question
+
+
+def negotiate(app, accept_encoding):
+    with app.test_request_context(headers={"Accept-Encoding": accept_encoding}):
+        return compression.choose_encoding()
+
+
+def test_accept_encoding_negotiation(app, monkeypatch):
+    monkeypatch.setattr(compression, "brotli", object())
+    assert negotiate(app, "gzip, deflate, br") == "br"
+    assert negotiate(app, "br;q=0, gzip") == "gzip"
+    assert negotiate(app, "gzip;q=0") is None
+    assert negotiate(app, "gzip;q=abc") is None
+    assert negotiate(app, "identity") is None
+    assert negotiate(app, "") is None
+
+    # Sin el paquete brotli solo se ofrece gzip
+    monkeypatch.setattr(compression, "brotli", None)
+    assert negotiate(app, "br, gzip;q=0.5") == "gzip"
+    assert negotiate(app, "br") is None
+
+
+def buffered(app, body, accept_encoding="gzip"):
+    with app.test_request_context(headers={"Accept-Encoding": accept_encoding}):
+        return compression.compress_response(Response(body, mimetype="application/json"))
+
+
+def test_buffered_responses_are_compressed_from_min_size(app):
+    app.config["COMPRESSION_MIN_SIZE"] = 100
+    small = buffered(app, "x" * 99)
+    assert "Content-Encoding" not in small.headers
+    assert small.get_data() == b"x" * 99
+    assert "Accept-Encoding" in small.vary
+
+    big = buffered(app, "x" * 100)
+    assert big.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(big.get_data()) == b"x" * 100
+
+    assert "Content-Encoding" not in buffered(app, "x" * 100, accept_encoding="identity").headers
+
+
+def test_streamed_responses_are_compressed_at_any_size(app):
+    app.config["COMPRESSION_MIN_SIZE"] = 10_000
+    with app.test_request_context(headers={"Accept-Encoding": "gzip"}):
+        response = compression.compress_response(
+            Response(iter(['["a"', "]"]), mimetype="application/json")
+        )
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert gzip.decompress(b"".join(response.response)) == b'["a"]'
+
+
+def test_dashboard_etag_becomes_weak_and_still_answers_304(app, client, login):
+    app.config["COMPRESSION_MIN_SIZE"] = 0
+    headers = dict(login("alumno"), **{"Accept-Encoding": "gzip"})
+    unit_id = make_unit(client)
+    make_open_question(client, unit_id)
+
+    resp = client.get(f"/units/{unit_id}/dashboard", headers=headers)
+    assert resp.headers["Content-Encoding"] == "gzip"
+    etag, weak = resp.get_etag()
+    assert weak and resp.headers["ETag"].startswith("W/")
+    assert json.loads(gzip.decompress(resp.get_data()))["unit"]["_id"] == unit_id
+
+    again = client.get(f"/units/{unit_id}/dashboard", headers=dict(headers, **{"If-None-Match": resp.headers["ETag"]}))
+    assert again.status_code == 304
+    assert "Content-Encoding" not in again.headers
+
+
+@pytest.mark.parametrize("accept_encoding", ["gzip", ""])
+def test_streamed_listing_reads_by_pages_and_decodes(client, monkeypatch, accept_encoding):
+    from repositories import sqlite
+    monkeypatch.setattr(sqlite, "PAGE_SIZE", 2)
+    monkeypatch.setattr(compression, "STREAM_CHUNK_SIZE", 64)
+    unit_id = make_unit(client)
+    ids = [make_open_question(client, unit_id, answer=str(i)) for i in range(5)]
+
+    resp = client.get(f"/questions?unit_id={unit_id}", headers=dict(HEADERS, **{"Accept-Encoding": accept_encoding}))
+    assert resp.is_streamed and "Content-Length" not in resp.headers
+    body = resp.get_data()
+    if accept_encoding:
+        assert resp.headers["Content-Encoding"] == "gzip"
+        body = gzip.decompress(body)
+    assert [q["_id"] for q in json.loads(body)] == ids
+
+
+def test_sqlite_listings_are_read_by_pages(monkeypatch):
+    from repositories import sqlite
+    monkeypatch.setattr(sqlite, "PAGE_SIZE", 2)
+    repos = sqlite.SqliteStorage(":memory:").repos()
+    ids = [repos.answers.create({"user_id": "u", "n": i}) for i in range(5)]
+
+    listing = repos.answers.find(user_id="u")
+    assert not isinstance(listing, list)
+    assert [a["_id"] for a in listing] == ids
+    assert [a["_id"] for a in repos.answers.all()] == ids
@@ -0,0 +1,103 @@
+# Cursos: cada request ve solo los datos de los cursos de su token.
+import sqlite3
+
+import pytest
+from bson import ObjectId, json_util
+
+from conftest import HEADERS, make_unit, make_open_question, with_course
+from repositories.sqlite import SqliteStorage
+
+
+@pytest.fixture
+def courses(client):
+    for course in ("A", "B", "C", None):
+        make_unit(client, course, title=f"u{course or '-'}")
+
+
+def unit_titles(client, headers):
+    resp = client.get("/units", headers=headers)
+    if resp.status_code != 200:
+        return resp.status_code
+    return sorted(u["title"] for u in resp.json)
+
+
+def test_anonymous_requests_only_see_uncoursed_data(client, courses):
+    assert unit_titles(client, HEADERS) == ["u-"]
+    assert unit_titles(client, with_course(HEADERS, "C")) == 403
+
+
+def test_user_sees_only_their_courses(client, login, courses):
+    single = login("a", courses=["A"])
+    assert unit_titles(client, single) == ["uA"]
+    assert unit_titles(client, with_course(single, "B")) == 403
+
+    several = login("ab", courses=["A", "B"])
+    assert unit_titles(client, several) == 400
+    assert unit_titles(client, with_course(several, "B")) == ["uB"]
+    assert unit_titles(client, with_course(several, "C")) == 403
+
+    assert unit_titles(client, login("none")) == ["u-"]
+
+
+def test_admin_sees_every_course(client, login, courses):
+    admin = login("adm", role="admin")
+    assert unit_titles(client, admin) == ["u-", "uA", "uB", "uC"]
+    assert unit_titles(client, with_course(admin, "C")) == ["uC"]
+
+
+def test_login_returns_the_courses(client, login):
+    login("ab", courses=["A", "B"])
+    resp = client.post("/login", json={"DNI": "ab", "password": "pw"}, headers=HEADERS)
+    assert resp.json["courses"] == ["A", "B"]
+
+
+def test_routes_of_a_unit_of_another_course_are_forbidden(client, login):
+    unit_id = make_unit(client, "B")
+    make_open_question(client, unit_id)
+    user_id = str(ObjectId())
+    urls = [
+        f"/units/{unit_id}",
+        f"/units/{unit_id}/dashboard",
+        f"/units/{unit_id}/help-status?user_id={user_id}",
+        f"/questions?unit_id={unit_id}",
+    ]
+    other, member = login("a", courses=["A"]), login("b", courses=["B"])
+    for url in urls:
+        assert client.get(url, headers=other).status_code == 403, url
+        assert client.get(url, headers=member).status_code == 200, url
+    assert client.get(f"/units/{unit_id}", headers=HEADERS).status_code == 403
+
+    questions = client.get(f"/questions?unit_id={unit_id}", headers=member).json
+    assert [q["unit_id"] for q in questions] == [unit_id]
+
+
+def test_report_of_a_user_of_another_course_is_forbidden(client, login, app_repos):
+    headers = login("doc", role="docente", courses=["A"])
+    login("b", courses=["B"])
+    login("a", courses=["A"])
+    student_b = str(app_repos.users.by_dni("b")["_id"])
+    student_a = str(app_repos.users.by_dni("a")["_id"])
+
+    assert client.get(f"/users/report?user_id={student_b}", headers=headers).status_code == 403
+    assert client.get(f"/users/report?user_id={student_b}", headers=HEADERS).status_code == 403
+    assert client.get(f"/users/report?user_id={student_a}", headers=headers).status_code == 200
+    admin = login("adm", role="admin")
+    assert client.get(f"/users/report?user_id={student_b}", headers=admin).status_code == 200
+
+
+def test_sqlite_migrates_the_old_courses_column(tmp_path):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE users (id TEXT PRIMARY KEY, dni TEXT, courses TEXT, updated TEXT, doc TEXT NOT NULL)")
+    for dni, courses in (("ab", ["A", "B"]), ("none", [])):
+        doc = {"_id": ObjectId(), "DNI": dni, "courses": courses}
+        conn.execute(
+            "INSERT INTO users (id, dni, courses, doc) VALUES (?, ?, ?, ?)",
+            (str(doc["_id"]), dni, "|" + "|".join(courses) + "|" if courses else None, json_util.dumps(doc)),
+        )
+    conn.commit()
+    conn.close()
+
+    repos = SqliteStorage(path).repos()
+    assert [u["DNI"] for u in repos.users.all("B")] == ["ab"]
+    assert [u["DNI"] for u in repos.users.all("")] == ["none"]
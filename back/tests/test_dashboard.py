@@ -0,0 +1,38 @@
+# Tablero de la unidad: nunca expone las respuestas correctas.
+from conftest import HEADERS, make_unit, make_open_question, make_choice_question
+
+
+def test_dashboard_does_not_leak_answers(client, login, app_repos):
+    headers = login("alumno")
+    user_id = app_repos.users.by_dni("alumno")["_id"]
+    unit_id = make_unit(client)
+    open_q = make_open_question(client, unit_id, hint1={"text": "pista", "penalty": 0.5})
+    choice_q = make_choice_question(client, unit_id)
+
+    client.post(f"/questions/{open_q}/help", json={"user_id": str(user_id), "helpNumber": 1}, headers=HEADERS)
+    client.post("/answers", json={"question_id": open_q, "user_id": str(user_id), "body": "SI"}, headers=HEADERS)
+
+    resp = client.get(f"/units/{unit_id}/dashboard", headers=headers)
+    assert resp.status_code == 200
+    questions = {q["_id"]: q for q in resp.json["questions"]}
+    assert "expectedAnswer" not in questions[open_q]
+    assert questions[open_q]["hint1"] == {"penalty": 0.5}
+    assert questions[choice_q]["options"] == [{"body": "0"}, {"body": "1"}]
+    assert resp.json["solved"] == [open_q]
+    assert resp.json["exp"] == 5
+    assert resp.json["helpStatus"][open_q] == {"usedHelp1": True, "usedHelp2": False}
+
+    again = client.get(f"/units/{unit_id}/dashboard", headers=dict(headers, **{"If-None-Match": resp.headers["ETag"]}))
+    assert again.status_code == 304
+
+
+def test_dashboard_hides_the_answers_of_an_unanswered_unit(client, login):
+    headers = login("alumno")
+    unit_id = make_unit(client)
+    choice_q = make_choice_question(client, unit_id)
+
+    resp = client.get(f"/units/{unit_id}/dashboard", headers=headers).json
+    [question] = resp["questions"]
+    assert question["_id"] == choice_q
+    assert all(set(opt) == {"body"} for opt in question["options"])
+    assert resp["solved"] == [] and resp["exp"] == 0
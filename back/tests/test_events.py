@@ -0,0 +1,115 @@
+# Log de eventos de respuestas y hints (GET /events).
+from bson import ObjectId
+
+from conftest import HEADERS, make_unit, make_open_question
+
+
+def read_all_events(client, headers, limit=100):
+    events, cursor = [], None
+    while True:
+        url = f"/events?limit={limit}" + (f"&cursor={cursor}" if cursor else "")
+        resp = client.get(url, headers=headers).json
+        events += resp["events"]
+        cursor = resp["cursor"]
+        if not resp["hasMore"]:
+            return events, cursor
+
+
+def test_answers_and_hints_publish_events_in_order(client, login):
+    admin = login("adm", role="admin")
+    unit_id = make_unit(client)
+    q_id = make_open_question(client, unit_id, hint1={"text": "pista", "penalty": 0.5})
+    user_id = str(ObjectId())
+
+    client.post(f"/questions/{q_id}/help", json={"user_id": user_id, "helpNumber": 1}, headers=HEADERS)
+    answer = client.post("/answers", json={"question_id": q_id, "user_id": user_id, "body": "si"}, headers=HEADERS).json
+    client.post("/answers", json={"question_id": q_id, "user_id": user_id, "body": "no"}, headers=HEADERS)
+
+    events, cursor = read_all_events(client, admin, limit=2)
+    assert [ev["type"] for ev in events] == ["hint_used", "answer_graded", "exp_awarded", "answer_graded"]
+    assert [ev["seq"] for ev in events] == sorted(ev["seq"] for ev in events)
+    assert events[1]["answer_id"] == answer["answer_id"] and events[1]["correct"]
+    assert events[2]["amount"] == 5
+    assert not events[3]["correct"]
+
+    resp = client.get(f"/events?cursor={cursor}", headers=admin).json
+    assert resp["events"] == [] and resp["cursor"] == cursor
+    hints = client.get("/events?types=hint_used", headers=admin).json["events"]
+    assert [ev["type"] for ev in hints] == ["hint_used"]
+
+
+def test_events_wait_for_the_settle_window(app, client, login, app_repos, monkeypatch):
+    admin = login("adm", role="admin")
+    q_id = make_open_question(client, make_unit(client))
+    client.post("/answers", json={"question_id": q_id, "user_id": str(ObjectId()), "body": "si"}, headers=HEADERS)
+
+    # Con una base que confirma en orden no hay ventana
+    app.config["EVENTS_SETTLE_MS"] = 60_000
+    assert len(client.get("/events", headers=admin).json["events"]) == 2
+
+    # Sin ese orden (mongod suelto) se espera, y hasMore avisa que no hay que volver enseguida
+    monkeypatch.setattr(app_repos.events, "commits_in_order", False)
+    resp = client.get("/events", headers=admin).json
+    assert resp["events"] == [] and not resp["hasMore"]
+    app.config["EVENTS_SETTLE_MS"] = 0
+    assert len(client.get(f"/events?cursor={resp['cursor']}", headers=admin).json["events"]) == 2
+
+
+def test_events_survive_a_failing_log(app, client, login, app_repos, monkeypatch):
+    admin = login("adm", role="admin")
+    unit_id = make_unit(client)
+    q_id = make_open_question(client, unit_id, hint1={"text": "pista", "penalty": 0.5})
+    user_id = str(ObjectId())
+
+    def log_down(events):
+        raise RuntimeError("log caído")
+
+    monkeypatch.setattr(app_repos.events, "append", log_down)
+    client.post(f"/questions/{q_id}/help", json={"user_id": user_id, "helpNumber": 1}, headers=HEADERS)
+    resp = client.post("/answers", json={"question_id": q_id, "user_id": user_id, "body": "si"}, headers=HEADERS)
+    assert resp.status_code == 201 and resp.json["expAwarded"] == 5
+    assert len(app_repos.answers.with_pending()) == 1
+    assert len(app_repos.helps.with_pending()) == 1
+    assert "pendingEvents" not in app_repos.answers.get(ObjectId(resp.json["answer_id"]))
+    monkeypatch.undo()
+
+    # Un relay que llegó al log pero no alcanzó a limpiar el documento
+    [pending] = app_repos.answers.with_pending()
+    app_repos.events.append(pending["pendingEvents"])
+
+    from jobs import JOBS
+    with app.app_context():
+        JOBS["relay_events"]["fn"]()
+    assert app_repos.answers.with_pending() == [] and app_repos.helps.with_pending() == []
+
+    events, _ = read_all_events(client, admin)
+    assert sorted(ev["type"] for ev in events) == ["answer_graded", "exp_awarded", "hint_used"]
+
+
+def test_events_are_relayed_on_read(client, login, app_repos, monkeypatch):
+    admin = login("adm", role="admin")
+    q_id = make_open_question(client, make_unit(client))
+    monkeypatch.setattr(app_repos.events, "append", lambda events: 1 / 0)
+    client.post("/answers", json={"question_id": q_id, "user_id": str(ObjectId()), "body": "no"}, headers=HEADERS)
+    monkeypatch.undo()
+
+    events, _ = read_all_events(client, admin)
+    assert [ev["type"] for ev in events] == ["answer_graded"]
+
+
+def test_events_of_a_course(client, login):
+    q_a = make_open_question(client, make_unit(client, "A"))
+    q_b = make_open_question(client, make_unit(client, "B"))
+    for q_id in (q_a, q_b):
+        client.post("/answers", json={"question_id": q_id, "user_id": str(ObjectId()), "body": "no"}, headers=HEADERS)
+
+    docente = login("doc", role="docente", courses=["A"])
+    events, _ = read_all_events(client, docente)
+    assert [(ev["type"], ev["question_id"]) for ev in events] == [("answer_graded", q_a)]
+
+
+def test_events_reject_bad_parameters(client, login):
+    admin = login("adm", role="admin")
+    assert client.get("/events?cursor=zzz", headers=admin).status_code == 400
+    assert client.get("/events?types=foo", headers=admin).status_code == 400
+    assert client.get("/events", headers=login("alumno")).status_code == 403
@@ -0,0 +1,36 @@
+# Hints en lote: el estado devuelto sale de las escrituras mismas.
+from bson import ObjectId
+
+from conftest import HEADERS, make_unit, make_open_question
+
+
+def test_batch_hints_report_the_written_status(client, app_repos):
+    unit_id = make_unit(client)
+    hints = {"hint1": {"text": "uno", "penalty": 0.1}, "hint2": {"text": "dos", "penalty": 0.2}}
+    q1 = make_open_question(client, unit_id, **hints)
+    q2 = make_open_question(client, unit_id, **hints)
+    user_id = str(ObjectId())
+
+    client.post(f"/questions/{q2}/help", json={"user_id": user_id, "helpNumber": 2}, headers=HEADERS)
+    resp = client.post("/questions/help", json={"user_id": user_id, "helps": [
+        {"question_id": q1, "helpNumber": 1}, {"question_id": q1, "helpNumber": 2},
+        {"question_id": q2, "helpNumber": 1},
+    ]}, headers=HEADERS)
+    assert resp.status_code == 200
+    assert resp.json[q1] == {
+        "hints": {"1": {"text": "uno", "penalty": 0.1}, "2": {"text": "dos", "penalty": 0.2}},
+        "usedHelp1": True, "usedHelp2": True,
+    }
+    assert resp.json[q2]["usedHelp1"] and resp.json[q2]["usedHelp2"]
+    assert list(resp.json[q2]["hints"]) == ["1"]
+
+
+def test_batch_hints_validate_before_writing(client, app_repos):
+    unit_id = make_unit(client)
+    q1 = make_open_question(client, unit_id, hint1={"text": "uno", "penalty": 0.1})
+    user_id = ObjectId()
+    resp = client.post("/questions/help", json={"user_id": str(user_id), "helps": [
+        {"question_id": q1, "helpNumber": 1}, {"question_id": q1, "helpNumber": 2},
+    ]}, headers=HEADERS)
+    assert resp.status_code == 400
+    assert app_repos.helps.get_for(user_id, ObjectId(q1)) is None
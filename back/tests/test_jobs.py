@@ -0,0 +1,82 @@
+# Jobs que precalculan listados: una foto por curso, servida por filas.
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import HEADERS
+from jobs import JOBS, Cron, Scheduler
+from repositories.sqlite import SqliteSnapshots
+
+
+@pytest.fixture
+def jobs_app(app, app_repos, client):
+    app.config["JOBS_ENABLED"] = True
+    for dni, courses in (("a", ["A"]), ("b", ["B"]), ("none", [])):
+        app_repos.users.create({"DNI": dni, "name": dni, "role": "user", "courses": courses, "exp": 0})
+    for course in ("A", "B"):
+        app_repos.units.create({"title": course, "course_id": course})
+    return app
+
+
+def test_leaderboard_snapshot_per_course(jobs_app, client, login, monkeypatch):
+    monkeypatch.setattr(SqliteSnapshots, "rows_batch", 1)
+    with jobs_app.app_context():
+        JOBS["leaderboard"]["fn"]()
+
+    # Las fotos son anteriores a los usuarios de login: no los incluyen
+    resp = client.get("/users", headers=login("alumno", courses=["A"]))
+    assert "X-Generated-At" in resp.headers
+    assert [u["DNI"] for u in resp.json] == ["a"]
+
+    resp = client.get("/users", headers=login("adm", role="admin"))
+    assert [u["DNI"] for u in resp.json] == ["a", "b", "none"]
+
+    resp = client.get("/users", headers=HEADERS)
+    assert [u["DNI"] for u in resp.json] == ["none"]
+
+
+def test_users_report_snapshot_and_fresh(jobs_app, client, login):
+    with jobs_app.app_context():
+        JOBS["users_report"]["fn"]()
+    headers = login("adm", role="admin")
+
+    resp = client.get("/users/report", headers=headers)
+    assert "X-Generated-At" in resp.headers
+    assert len(resp.json) == 3
+    fresh = client.get("/users/report?fresh=1", headers=headers)
+    assert "X-Generated-At" not in fresh.headers
+    assert len(fresh.json) == 4
+
+
+def test_scheduler_renews_the_lease_and_keeps_a_requested_run(app, app_repos, monkeypatch):
+    app.config["JOBS_LEASE_SECONDS"] = 0.3
+    running, finish, runs = threading.Event(), threading.Event(), []
+
+    def slow():
+        runs.append(1)
+        running.set()
+        finish.wait(5)
+
+    monkeypatch.setitem(JOBS, "slow", {"fn": slow, "schedule": "0 * * * *", "cron": Cron("0 * * * *")})
+    app_repos.jobs.register("slow", "0 * * * *", datetime.utcnow() - timedelta(minutes=1))
+    first, second = Scheduler(app), Scheduler(app)
+    second.owner = "otro-worker"
+    try:
+        first.tick()
+        assert running.wait(5)
+        # El job dura más que el lease: el heartbeat lo mantiene tomado
+        time.sleep(0.8)
+        second.tick()
+        assert app_repos.jobs.get("slow")["lockedBy"] == first.owner
+        requested = datetime.utcnow().replace(microsecond=0)
+        assert app_repos.jobs.request_run("slow", requested)
+    finally:
+        finish.set()
+        first.executor.shutdown(wait=True)
+        second.executor.shutdown(wait=True)
+
+    job = app_repos.jobs.get("slow")
+    assert runs == [1]
+    assert (job["lockedBy"], job["lastStatus"], job["nextRunAt"]) == (None, "ok", requested)
@@ -0,0 +1,79 @@
+# Profiling por muestreo y listado de los profiles (solo admin).
+import os
+
+import pytest
+
+import profiling
+from conftest import HEADERS
+
+PROFILE = {"X-Profile": "1"}
+
+
+@pytest.fixture
+def profile_dir(app, tmp_path):
+    directory = tmp_path / "profiles"
+    app.config.update(PROFILE_DIR=str(directory), PROFILE_SAMPLE_RATE=0.0, PROFILE_INTERVAL_MS=1)
+    return directory
+
+
+def get_units(client, headers):
+    resp = client.get("/units", headers=headers)
+    resp.close()
+    return resp
+
+
+def saved(directory):
+    return sorted(os.listdir(directory)) if directory.exists() else []
+
+
+def test_only_admins_can_ask_for_a_profile(client, login, profile_dir):
+    assert "X-Profiled" not in get_units(client, dict(HEADERS, **PROFILE)).headers
+    assert "X-Profiled" not in get_units(client, dict(login("alumno"), **PROFILE)).headers
+    assert "X-Profiled" not in get_units(client, dict(login("doc", role="docente"), **PROFILE)).headers
+    assert saved(profile_dir) == []
+
+    admin = login("adm", role="admin")
+    assert "X-Profiled" not in get_units(client, admin).headers
+    assert get_units(client, dict(admin, **PROFILE)).headers["X-Profiled"] == "1"
+    [name] = saved(profile_dir)
+    assert name.endswith(".collapsed") and "-units-get_units-" in name
+
+
+@pytest.mark.parametrize("rate, profiled", [(0.0, False), (1.0, True)])
+def test_sample_rate(app, client, profile_dir, rate, profiled):
+    app.config["PROFILE_SAMPLE_RATE"] = rate
+    for _ in range(3):
+        assert ("X-Profiled" in get_units(client, HEADERS).headers) == profiled
+    assert len(saved(profile_dir)) == (3 if profiled else 0)
+
+
+def test_rotate_keeps_the_newest_files(tmp_path):
+    names = [f"2026010{i}T000000000000-units-get_units-{i}ms.collapsed" for i in range(1, 6)]
+    for name in names + ["notas.txt"]:
+        (tmp_path / name).write_text("")
+    profiling._rotate(str(tmp_path), 2)
+    assert sorted(os.listdir(tmp_path)) == names[-2:] + ["notas.txt"]
+    profiling._rotate(str(tmp_path), 0)
+    assert len(os.listdir(tmp_path)) == 3
+
+
+def test_old_profiles_are_rotated_while_capturing(app, client, profile_dir):
+    app.config.update(PROFILE_SAMPLE_RATE=1.0, PROFILE_MAX_FILES=2)
+    for _ in range(4):
+        get_units(client, HEADERS)
+    assert len(saved(profile_dir)) == 2
+
+
+def test_list_profiles_parses_the_file_name(client, login, profile_dir):
+    profile_dir.mkdir()
+    (profile_dir / "20260101T000000000000-units-get_units-12ms.collapsed").write_text("main 1\n")
+    (profile_dir / "20260102T000000000000-questions-get_questions-bad.collapsed").write_text("")
+    (profile_dir / "leeme.txt").write_text("")
+
+    resp = client.get("/profiles", headers=login("adm", role="admin"))
+    assert resp.status_code == 200
+    assert [(p["capturedAt"], p["endpoint"], p["durationMs"], p["size"]) for p in resp.json] == [
+        ("20260102T000000000000", "questions-get_questions", None, 0),
+        ("20260101T000000000000", "units-get_units", 12, 7),
+    ]
+    assert client.get("/profiles", headers=login("alumno")).status_code == 403
@@ -0,0 +1,437 @@
+# Contrato de los repositorios: MongoDB y SQLite tienen que comportarse igual.
+import threading
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from repositories import NO_COURSE
+
+
+def ms(dt):
+    """Fechas con la precisión de BSON (milisegundos)."""
+    return dt.replace(microsecond=dt.microsecond // 1000 * 1000)
+
+
+T0 = datetime(2024, 3, 1, 12, 0, 0)
+
+
+# -------------------------------
+# CRUD
+# -------------------------------
+def test_crud(repos):
+    unit_id = repos.units.create({"title": "U1", "level": 1})
+    assert isinstance(unit_id, ObjectId)
+    assert repos.units.get(unit_id)["title"] == "U1"
+
+    assert repos.units.update(unit_id, {"title": "U2"})
+    assert repos.units.get(unit_id) == {"_id": unit_id, "title": "U2", "level": 1}
+    assert not repos.units.update(ObjectId(), {"title": "x"})
+
+    other = repos.units.create({"title": "U3"})
+    assert {u["_id"] for u in repos.units.by_ids([unit_id, other, ObjectId()])} == {unit_id, other}
+    assert [u["_id"] for u in repos.units.all()] == [unit_id, other]
+
+    assert repos.units.delete(unit_id)
+    assert not repos.units.delete(unit_id)
+    assert repos.units.get(unit_id) is None
+
+
+def test_writes_stamp_updated_at(repos):
+    before = datetime.utcnow() - timedelta(seconds=1)
+    q_id = repos.questions.create({"body": "?"})
+    first = repos.questions.get(q_id)["updatedAt"]
+    assert first >= before
+    repos.questions.update(q_id, {"body": "!"})
+    assert repos.questions.get(q_id)["updatedAt"] >= first
+    # Las tablas que no exporta la carga incremental no lo llevan
+    assert "updatedAt" not in repos.units.get(repos.units.create({"title": "U"}))
+
+
+def test_users(repos):
+    u_id = repos.users.create({"DNI": "123", "exp": 10, "courses": ["A"]})
+    assert repos.users.by_dni("123")["_id"] == u_id
+    assert repos.users.by_dni("999") is None
+    repos.users.add_exp(u_id, 5)
+    assert repos.users.get(u_id)["exp"] == 15
+    repos.users.set_password("123", "hash")
+    assert repos.users.get(u_id)["password"] == "hash"
+
+
+def test_course_filters(repos):
+    repos.users.create({"DNI": "a", "courses": ["A"]})
+    repos.users.create({"DNI": "ab", "courses": ["A", "B"]})
+    repos.users.create({"DNI": "none", "courses": []})
+    repos.users.create({"DNI": "legacy"})
+    for course in ("A", "B", None):
+        repos.units.create({"title": f"u{course}", **({"course_id": course} if course else {})})
+
+    assert sorted(u["DNI"] for u in repos.users.all("A")) == ["a", "ab"]
+    assert sorted(u["DNI"] for u in repos.users.all("B")) == ["ab"]
+    assert sorted(u["DNI"] for u in repos.users.all(NO_COURSE)) == ["legacy", "none"]
+    assert len(list(repos.users.all())) == 4
+    assert [u["title"] for u in repos.units.all(NO_COURSE)] == ["uNone"]
+    assert sorted(repos.units.course_ids()) == ["A", "B"]
+
+
+def test_user_courses_are_matched_exactly(repos):
+    wild = repos.users.create({"DNI": "wild", "courses": ["2024_%"]})
+    repos.users.create({"DNI": "plain", "courses": ["2024-A", "20241A"]})
+    assert [u["DNI"] for u in repos.users.all("2024_%")] == ["wild"]
+    assert list(repos.users.all("2024_A")) == []
+    assert list(repos.users.all("%")) == []
+
+    repos.users.update(wild, {"courses": ["B"]})
+    assert list(repos.users.all("2024_%")) == []
+    assert [u["DNI"] for u in repos.users.all("B")] == ["wild"]
+    assert repos.users.delete(wild)
+    assert list(repos.users.all("B")) == []
+
+
+def test_questions_by_unit(repos):
+    unit_id = repos.units.create({"title": "U"})
+    q1 = repos.questions.create({"unit_id": unit_id})
+    q2 = repos.questions.create({"unit_id": unit_id})
+    repos.questions.create({"unit_id": ObjectId()})
+    assert [q["_id"] for q in repos.questions.by_unit(unit_id)] == [q1, q2]
+    assert repos.questions.ids_by_unit(unit_id) == [q1, q2]
+
+
+# -------------------------------
+# Respuestas
+# -------------------------------
+def test_answers_find_filters(repos):
+    u1, u2, q1, q2, q3 = (ObjectId() for _ in range(5))
+    a = repos.answers.create({"user_id": u1, "question_id": q1, "course_id": "A"})
+    b = repos.answers.create({"user_id": u1, "question_id": q2})
+    c = repos.answers.create({"user_id": u2, "question_id": q1, "course_id": "A"})
+    d = repos.answers.create({"user_id": u2, "question_id": q3, "course_id": "B"})
+
+    def ids(**kw):
+        return [x["_id"] for x in repos.answers.find(**kw)]
+
+    assert ids() == [a, b, c, d]
+    assert ids(user_id=u1) == [a, b]
+    assert ids(question_id=q1) == [a, c]
+    assert ids(user_id=u2, question_id=q1) == [c]
+    assert ids(question_ids=[q2, q3]) == [b, d]
+    assert ids(user_id=u1, question_ids=[q1, q3]) == [a]
+    assert ids(question_ids=[]) == []
+    assert ids(course_id="A") == [a, c]
+    assert ids(course_id=NO_COURSE) == [b]
+    assert ids(course_id="B", user_id=u1) == []
+
+
+def test_answers_created_before_and_delete_many(repos):
+    ids = [repos.answers.create({"n": i}) for i in range(5)]
+    assert [a["_id"] for a in repos.answers.created_before(ids[3], 2)] == ids[:2]
+    assert [a["_id"] for a in repos.answers.created_before(ids[3], 10)] == ids[:3]
+    assert repos.answers.delete_many(ids[:2]) == 2
+    assert repos.answers.delete_many([]) == 0
+    assert [a["_id"] for a in repos.answers.all()] == ids[2:]
+
+
+def test_pending_events_are_hidden_until_cleared(repos):
+    u, q = ObjectId(), ObjectId()
+    a_id = repos.answers.create({"user_id": u, "question_id": q,
+                                 "pendingEvents": [{"key": "k1"}, {"key": "k2"}]})
+    plain = repos.answers.create({"user_id": u, "question_id": q})
+
+    reads = [repos.answers.get(a_id), *repos.answers.all(), *repos.answers.find(user_id=u),
+             *repos.answers.by_ids([a_id]), *repos.answers.scan()]
+    assert all("pendingEvents" not in doc for doc in reads)
+
+    pending = repos.answers.with_pending()
+    assert [(d["_id"], [e["key"] for e in d["pendingEvents"]]) for d in pending] == [(a_id, ["k1", "k2"])]
+    assert repos.answers.with_pending(ids=[plain]) == []
+
+    before = repos.answers.scan()
+    updated_at = next(d for d in before if d["_id"] == a_id)["updatedAt"]
+    repos.answers.clear_pending(a_id, ["k1"])
+    assert [e["key"] for e in repos.answers.with_pending()[0]["pendingEvents"]] == ["k2"]
+    repos.answers.clear_pending(a_id, ["k2"])
+    assert repos.answers.with_pending() == []
+    # Sacar los pendientes no es un cambio del documento para la exportación
+    assert repos.answers.get(a_id)["updatedAt"] == updated_at
+
+
+# -------------------------------
+# Hints
+# -------------------------------
+def test_helps_mark_used_and_for_user(repos):
+    u, q1, q2 = ObjectId(), ObjectId(), ObjectId()
+    when = ms(datetime.utcnow())
+    events = [{"key": "e1", "question_id": q1}, {"key": "e2", "question_id": q1}, {"key": "e3", "question_id": q2}]
+
+    updated = repos.helps.mark_used(u, [(q1, 1), (q1, 2), (q2, 1)], when, events)
+    assert set(updated) == {q1, q2}
+    assert updated[q1]["usedHelp1"] and updated[q1]["usedHelp2"]
+    assert updated[q2]["usedHelp1"] and not updated[q2].get("usedHelp2")
+    assert all("pendingEvents" not in doc for doc in updated.values())
+
+    pending = {d["_id"]: sorted(e["key"] for e in d["pendingEvents"]) for d in repos.helps.with_pending()}
+    assert pending == {updated[q1]["_id"]: ["e1", "e2"], updated[q2]["_id"]: ["e3"]}
+
+    # Volver a marcar actualiza el mismo registro (un documento por usuario + pregunta)
+    again = repos.helps.mark_used(u, [(q2, 2)], when)
+    assert again[q2]["_id"] == updated[q2]["_id"]
+    assert again[q2]["usedHelp1"] and again[q2]["usedHelp2"]
+    assert again[q2]["timestamp"] == when
+
+    assert repos.helps.get_for(u, q2)["usedHelp2"]
+    assert repos.helps.get_for(ObjectId(), q2) is None
+    assert sorted(h["question_id"] for h in repos.helps.for_user(u, [q1, q2, ObjectId()])) == sorted([q1, q2])
+    assert list(repos.helps.for_user(u, [])) == []
+    assert list(repos.helps.for_user(ObjectId(), [q1])) == []
+
+
+# -------------------------------
+# Resúmenes
+# -------------------------------
+def test_summaries_fold(repos):
+    u, q = ObjectId(), ObjectId()
+    repos.summaries.fold(u, q, 2, 1, 10, T0, T0 + timedelta(hours=1), T0 + timedelta(hours=1), T0,
+                         course_id="A", batch_id="b1")
+    repos.summaries.fold(u, q, 3, 1, 5, T0 - timedelta(days=1), T0 + timedelta(days=1), None, T0,
+                         course_id="A", batch_id="b2")
+    # Reaplicar el último lote (corrida retomada) no suma de nuevo
+    repos.summaries.fold(u, q, 3, 1, 5, T0 - timedelta(days=1), T0 + timedelta(days=1), None, T0,
+                         course_id="A", batch_id="b2")
+
+    [summary] = list(repos.summaries.for_user(u))
+    assert (summary["attempts"], summary["correctAttempts"], summary["expAwarded"]) == (5, 2, 15)
+    assert summary["firstAttemptAt"] == T0 - timedelta(days=1)
+    assert summary["lastAttemptAt"] == T0 + timedelta(days=1)
+    assert summary["firstCorrectAt"] == T0 + timedelta(hours=1)
+    assert summary["lastBatch"] == "b2"
+    assert [s["_id"] for s in repos.summaries.for_user(course_id="A")] == [summary["_id"]]
+    assert list(repos.summaries.for_user(course_id=NO_COURSE)) == []
+    assert list(repos.summaries.for_user(ObjectId())) == []
+
+
+def test_summaries_fold_is_idempotent_once_the_index_is_ensured(repos):
+    if hasattr(repos.summaries, "col"):
+        # Base de Mongo recién creada, sin los índices de ensure_indexes
+        repos.summaries.col.drop_indexes()
+    repos.summaries.ensure_index()
+    repos.summaries.ensure_index()
+    u, q = ObjectId(), ObjectId()
+    for _ in range(2):
+        repos.summaries.fold(u, q, 1, 1, 10, T0, T0, T0, T0, batch_id="b1")
+    [summary] = list(repos.summaries.for_user(u))
+    assert (summary["attempts"], summary["expAwarded"]) == (1, 10)
+
+
+# -------------------------------
+# Marcas de exportación y compactación
+# -------------------------------
+def test_watermarks_and_compactions(repos):
+    assert repos.watermarks.get("answers") is None
+    repos.watermarks.set("answers", {"value": T0, "id": None})
+    repos.watermarks.set("answers", {"id": "x"})
+    assert repos.watermarks.get("answers") == {"_id": "answers", "value": T0, "id": "x"}
+
+    repos.compactions.set("answers", {"batch": "b1", "stage": "archive"})
+    repos.compactions.set("answers", {"stage": "fold"})
+    assert repos.compactions.get("answers")["stage"] == "fold"
+    assert repos.compactions.delete("answers")
+    assert repos.compactions.get("answers") is None
+    assert repos.watermarks.get("answers") is not None
+
+
+# -------------------------------
+# Jobs
+# -------------------------------
+def test_jobs_acquire_release(repos):
+    repos.jobs.register("report", "0 * * * *", T0)
+    repos.jobs.register("report", "*/5 * * * *", T0 + timedelta(days=1))
+    job = repos.jobs.get("report")
+    # Registrar de nuevo cambia el horario pero no la próxima corrida
+    assert job["schedule"] == "*/5 * * * *" and job["nextRunAt"] == T0
+
+    assert repos.jobs.acquire("report", "w1", T0 - timedelta(minutes=1), T0) is None
+
+    lease = T0 + timedelta(minutes=10)
+    locked = repos.jobs.acquire("report", "w1", T0, lease)
+    assert locked["lockedBy"] == "w1" and locked["lockedUntil"] == lease
+    assert repos.jobs.acquire("report", "w2", T0 + timedelta(minutes=1), lease) is None
+
+    # Solo el dueño del lock lo libera
+    repos.jobs.release("report", "w2", {"lastStatus": "error"}, T0 + timedelta(hours=1), T0)
+    assert repos.jobs.get("report")["lockedBy"] == "w1"
+    repos.jobs.release("report", "w1", {"lastStatus": "ok"}, T0 + timedelta(hours=1), T0)
+    job = repos.jobs.get("report")
+    assert (job["lockedBy"], job["lockedUntil"], job["lastStatus"]) == (None, None, "ok")
+    assert job["nextRunAt"] == T0 + timedelta(hours=1)
+
+    assert repos.jobs.acquire("report", "w2", T0 + timedelta(minutes=30), lease) is None
+    assert repos.jobs.request_run("report", T0 + timedelta(minutes=30))
+    assert repos.jobs.acquire("report", "w2", T0 + timedelta(minutes=30), lease)["lockedBy"] == "w2"
+    assert repos.jobs.acquire("missing", "w1", T0, lease) is None
+
+
+def test_jobs_renew_extends_only_the_owners_lease(repos):
+    repos.jobs.register("report", "0 * * * *", T0)
+    repos.jobs.acquire("report", "w1", T0, T0 + timedelta(minutes=1))
+    assert not repos.jobs.renew("report", "w2", T0 + timedelta(minutes=5))
+    assert repos.jobs.renew("report", "w1", T0 + timedelta(minutes=5))
+    assert repos.jobs.acquire("report", "w2", T0 + timedelta(minutes=2), T0 + timedelta(minutes=9)) is None
+    assert repos.jobs.get("report")["lockedUntil"] == T0 + timedelta(minutes=5)
+
+
+def test_jobs_release_keeps_a_run_requested_meanwhile(repos):
+    repos.jobs.register("report", "0 * * * *", T0)
+    repos.jobs.acquire("report", "w1", T0, T0 + timedelta(minutes=10))
+    assert repos.jobs.request_run("report", T0 + timedelta(minutes=2))
+    repos.jobs.release("report", "w1", {"lastStatus": "ok"}, T0 + timedelta(hours=1), T0)
+    job = repos.jobs.get("report")
+    assert job["lockedBy"] is None and job["nextRunAt"] == T0 + timedelta(minutes=2)
+
+
+def test_jobs_expired_lease_can_be_taken(repos):
+    repos.jobs.register("report", "0 * * * *", T0)
+    repos.jobs.acquire("report", "w1", T0, T0 + timedelta(minutes=1))
+    taken = repos.jobs.acquire("report", "w2", T0 + timedelta(minutes=2), T0 + timedelta(minutes=5))
+    assert taken["lockedBy"] == "w2"
+
+
+# -------------------------------
+# Fotos precalculadas
+# -------------------------------
+def test_snapshots_stream_rows_and_keep_previous_generation(repos):
+    repos.snapshots.rows_batch = 3
+    repos.snapshots.put("report", ({"n": i} for i in range(7)), T0)
+    first = repos.snapshots.get("report")
+    assert (first["rows"], first["generatedAt"]) == (7, T0)
+    assert [r["n"] for r in repos.snapshots.rows(first)] == list(range(7))
+
+    repos.snapshots.put("report", ({"n": i} for i in range(2)), T0 + timedelta(hours=1))
+    second = repos.snapshots.get("report")
+    assert [r["n"] for r in repos.snapshots.rows(second)] == [0, 1]
+    # Quien ya tenía la cabecera anterior la sigue pudiendo leer entera
+    assert [r["n"] for r in repos.snapshots.rows(first)] == list(range(7))
+
+    repos.snapshots.put("report", iter([]), T0 + timedelta(hours=2))
+    assert list(repos.snapshots.rows(first)) == []
+    assert list(repos.snapshots.rows(repos.snapshots.get("report"))) == []
+    assert list(repos.snapshots.rows(second)) == [{"n": 0}, {"n": 1}]
+
+    # Fotos de versiones anteriores, con las filas en la cabecera
+    assert list(repos.snapshots.rows({"_id": "old", "data": [{"n": 1}]})) == [{"n": 1}]
+
+
+# -------------------------------
+# Log de eventos
+# -------------------------------
+def test_events_append_and_after(repos):
+    assert repos.events.last_seq() == 0
+    assert repos.events.after(0, 10) == []
+    repos.events.append([
+        {"key": "1", "type": "answer_graded", "course_id": "A", "at": T0},
+        {"key": "2", "type": "exp_awarded", "course_id": "A", "at": T0},
+        {"key": "3", "type": "hint_used", "course_id": None, "at": T0 + timedelta(days=2)},
+    ])
+    repos.events.append([])
+
+    events = repos.events.after(0, 10)
+    seqs = [ev["_id"] for ev in events]
+    assert [ev["key"] for ev in events] == ["1", "2", "3"]
+    assert seqs == sorted(seqs) and len(set(seqs)) == 3
+    assert all(isinstance(ev["loggedAt"], datetime) for ev in events)
+    assert repos.events.last_seq() == seqs[-1]
+
+    assert [ev["key"] for ev in repos.events.after(seqs[0], 10)] == ["2", "3"]
+    assert [ev["key"] for ev in repos.events.after(0, 2)] == ["1", "2"]
+    assert [ev["key"] for ev in repos.events.after(0, 10, types=["hint_used", "exp_awarded"])] == ["2", "3"]
+    assert [ev["key"] for ev in repos.events.after(0, 10, course_id="A")] == ["1", "2"]
+    assert [ev["key"] for ev in repos.events.after(0, 10, course_id=NO_COURSE)] == ["3"]
+
+    assert repos.events.delete_before(T0 + timedelta(days=1)) == 2
+    assert [ev["key"] for ev in repos.events.after(0, 10)] == ["3"]
+    # La secuencia no se reutiliza después de borrar
+    repos.events.append([{"key": "4", "type": "hint_used", "at": T0}])
+    assert repos.events.after(seqs[-1], 10)[0]["key"] == "4"
+
+
+def test_events_append_ignores_repeated_keys(repos):
+    repos.events.append([{"key": "1", "type": "answer_graded", "at": T0}])
+    repos.events.append([
+        {"key": "1", "type": "answer_graded", "at": T0},
+        {"key": "2", "type": "exp_awarded", "at": T0},
+    ])
+    assert [ev["key"] for ev in repos.events.after(0, 10)] == ["1", "2"]
+
+
+def test_events_concurrent_appends_get_distinct_sequences(repos):
+    def append_batches(worker):
+        for i in range(10):
+            repos.events.append([{"key": f"{worker}:{i}:{n}", "type": "hint_used", "at": T0} for n in range(2)])
+
+    threads = [threading.Thread(target=append_batches, args=(w,)) for w in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    events = repos.events.after(0, 100)
+    assert len({ev["key"] for ev in events}) == len({ev["_id"] for ev in events}) == 80
+    # Cada lote queda con números consecutivos
+    seq = {ev["key"]: ev["_id"] for ev in events}
+    assert all(seq[f"{w}:{i}:1"] == seq[f"{w}:{i}:0"] + 1 for w in range(4) for i in range(10))
+
+
+# -------------------------------
+# scan (exportación incremental)
+# -------------------------------
+def _helps_at(repos, times):
+    u = ObjectId()
+    docs = []
+    for when in times:
+        q = ObjectId()
+        docs.append(repos.helps.mark_used(u, [(q, 1)], when)[q])
+    return docs
+
+
+def test_scan_orders_by_field_then_id(repos):
+    docs = _helps_at(repos, [T0 + timedelta(minutes=2), T0, T0 + timedelta(minutes=1), T0])
+    order = [d["_id"] for d in sorted(docs, key=lambda d: (d["timestamp"], d["_id"]))]
+    assert [d["_id"] for d in repos.helps.scan(batch_size=1)] == order
+
+
+def test_scan_after_does_not_skip_ties(repos):
+    docs = _helps_at(repos, [T0, T0, T0, T0 + timedelta(minutes=1)])
+    order = [d["_id"] for d in sorted(docs, key=lambda d: (d["timestamp"], d["_id"]))]
+
+    # Cortar en medio de un grupo de fechas iguales no pierde el resto del grupo
+    rest = repos.helps.scan(after=(T0, order[0]), batch_size=1)
+    assert [d["_id"] for d in rest] == order[1:]
+    # Sin _id (marcas viejas) se incluyen los del mismo valor
+    assert [d["_id"] for d in repos.helps.scan(after=(T0, None))] == order
+    assert [d["_id"] for d in repos.helps.scan(after=(T0 + timedelta(minutes=1), order[-1]))] == []
+
+
+def test_scan_until(repos):
+    docs = _helps_at(repos, [T0, T0 + timedelta(minutes=1), T0 + timedelta(minutes=2)])
+    got = repos.helps.scan(until=T0 + timedelta(minutes=2))
+    assert [d["_id"] for d in got] == [docs[0]["_id"], docs[1]["_id"]]
+    got = repos.helps.scan(after=(T0, docs[0]["_id"]), until=T0 + timedelta(minutes=2))
+    assert [d["_id"] for d in got] == [docs[1]["_id"]]
+
+
+def test_scan_by_id(repos):
+    ids = [repos.units.create({"n": i}) for i in range(4)]
+    assert [d["_id"] for d in repos.units.scan(batch_size=2)] == ids
+    assert [d["_id"] for d in repos.units.scan(after=(ids[1], None), batch_size=2)] == ids[2:]
+
+
+def test_scan_follows_updates(repos):
+    first = repos.users.create({"DNI": "1"})
+    second = repos.users.create({"DNI": "2"})
+    [*_, last] = repos.users.scan()
+    mark = (last["updatedAt"], last["_id"])
+    assert list(repos.users.scan(after=mark)) == []
+
+    # Un documento modificado vuelve a aparecer después de la marca
+    time.sleep(0.005)
+    repos.users.update(first, {"name": "Ana"})
+    assert [d["_id"] for d in repos.users.scan(after=mark)] == [first]
+    assert [d["_id"] for d in repos.users.scan()] == [second, first]
@@ -1,9 +1,118 @@
 import secrets
 import string
+from functools import wraps
+from flask import jsonify, request, abort, make_response, g
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity, get_jwt
+from repositories import get_repos, NO_COURSE
 
 def generate_random_password(length=12):
     # Definir el conjunto de caracteres permitidos: letras y dígitos
     characters = string.ascii_letters + string.digits
     # Generar una contraseña aleatoria utilizando el conjunto definido
     password = ''.join(secrets.choice(characters) for _ in range(length))
-    return password
\ No newline at end of file
+    return password
+
+def roles_required(*roles):
+    """
+    Decorador: exige un JWT válido cuyo usuario tenga alguno de los roles dados
+    (por ejemplo "admin" o "docente").
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            verify_jwt_in_request()
+            user = get_repos().users.by_dni(get_jwt_identity(), {"role": 1})
+            if not user or user.get("role") not in roles:
+                return jsonify({"error": "Permisos insuficientes"}), 403
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def _jwt_claims():
+    try:
+        verify_jwt_in_request(optional=True)
+        return get_jwt() or {}
+    except Exception:
+        return {}
+
+def _is_admin():
+    """Si el usuario del JWT es admin (según la base, como roles_required)."""
+    if "is_admin" not in g:
+        identity = _jwt_claims().get("sub")
+        user = get_repos().users.by_dni(identity, {"role": 1}) if identity else None
+        g.is_admin = bool(user and user.get("role") == "admin")
+    return g.is_admin
+
+def require_course(course_id):
+    """
+    Corta el request con 403 si el JWT no incluye el curso. Los admin pueden
+    ver todos; sin JWT no se puede entrar a ningún curso.
+    """
+    if not course_id or _is_admin():
+        return
+    if course_id not in (_jwt_claims().get("courses") or []):
+        abort(make_response(jsonify({"error": "No pertenecés a ese curso"}), 403))
+
+def current_course():
+    """
+    Curso sobre el que opera el request: header X-Course o ?course_id=, que
+    tiene que estar entre los cursos del JWT. Si no se indica:
+      - admin: None (todos los cursos)
+      - JWT con un solo curso: ese curso
+      - JWT con varios cursos: 400, hay que elegir uno
+      - sin JWT o sin cursos: NO_COURSE (solo lo que no pertenece a ningún
+        curso, que en una instalación sin cursos es todo)
+    Nunca se cae a "todos los cursos" salvo para un admin.
+    """
+    if "course_id" not in g:
+        requested = request.headers.get("X-Course") or request.args.get("course_id")
+        courses = _jwt_claims().get("courses") or []
+        if requested:
+            require_course(requested)
+            g.course_id = requested
+        elif _is_admin():
+            g.course_id = None
+        elif len(courses) == 1:
+            g.course_id = courses[0]
+        elif courses:
+            abort(make_response(jsonify({"error": "Indicá el curso con el header X-Course"}), 400))
+        else:
+            g.course_id = NO_COURSE
+    return g.course_id
+
+def is_answer_correct(question, answer):
+    """
+    Determina si una respuesta guardada es correcta, con el mismo criterio que
+    usan los cálculos de exp de epUsers (selectedOption como índice, body sin
+    distinguir mayúsculas).
+    """
+    if "selectedOption" in answer:
+        try:
+            idx = int(answer["selectedOption"])
+        except (TypeError, ValueError):
+            return False
+        opts = question.get("options", [])
+        return 0 <= idx < len(opts) and bool(opts[idx].get("isCorrect"))
+    if "body" in answer:
+        expected = question.get("expectedAnswer", "").strip().lower()
+        return answer["body"].strip().lower() == expected
+    return False
+
+def net_exp(question, help_doc):
+    """Exp de la pregunta descontando las penalizaciones de los hints usados."""
+    help_doc = help_doc or {}
+    total_penalty = 0.0
+    if help_doc.get("usedHelp1"):
+        total_penalty += question.get("hint1", {}).get("penalty", 0)
+    if help_doc.get("usedHelp2"):
+        total_penalty += question.get("hint2", {}).get("penalty", 0)
+    total_penalty = min(total_penalty, 1.0)
+    return int(question.get("exp", 0) * (1 - total_penalty))
+
+def help_status(help_doc):
+    """Estado de hints de un documento de question_helps (o None si no usó ninguno)."""
+    help_doc = help_doc or {}
+    return {
+        "usedHelp1": bool(help_doc.get("usedHelp1", False)),
+        "usedHelp2": bool(help_doc.get("usedHelp2", False))
+    }
@@ -0,0 +1,35 @@
+import React, { useEffect, useState } from "react";
+import { useBoundStore } from "~/hooks/useBoundStore";
+import { storedCourses } from "~/utils/api";
+
+// Selector del curso activo; solo se muestra si el usuario está en más de uno
+export const CourseSelector = () => {
+  const course = useBoundStore((x) => x.course);
+  const setCourse = useBoundStore((x) => x.setCourse);
+  const loggedIn = useBoundStore((x) => x.loggedIn);
+  const [courses, setCourses] = useState<string[]>([]);
+
+  useEffect(() => {
+    setCourses(storedCourses());
+    setCourse(localStorage.getItem("course") ?? "");
+  }, [loggedIn, setCourse]);
+
+  if (courses.length < 2) return null;
+
+  return (
+    <label className="flex flex-col gap-1 px-2 text-sm font-bold uppercase text-gray-400">
+      Curso
+      <select
+        className="rounded-xl border-2 border-gray-200 bg-white px-2 py-1 normal-case text-gray-700"
+        value={course}
+        onChange={(e) => setCourse(e.target.value)}
+      >
+        {courses.map((c) => (
+          <option key={c} value={c}>
+            {c}
+          </option>
+        ))}
+      </select>
+    </label>
+  );
+};
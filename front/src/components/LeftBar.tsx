@@ -6,6 +6,7 @@ import { useBottomBarItems } from "./BottomBar";
 import type { LoginScreenState } from "./LoginScreen";
 import { LoginScreen } from "./LoginScreen";
 import { useBoundStore } from "~/hooks/useBoundStore";
+import { CourseSelector } from "./CourseSelector";
 
 const LeftBarMoreMenuSvg = (props: ComponentProps<"svg">) => {
   return (
@@ -110,6 +111,7 @@ export const LeftBar = ({ selectedTab }: { selectedTab: Tab | null }) => {
             </div>
           </div>
         </ul>
+        <CourseSelector />
       </nav>
       <LoginScreen
         loginScreenState={loginScreenState}
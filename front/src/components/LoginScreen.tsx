@@ -30,6 +30,7 @@ export const LoginScreen = ({
   const loggedIn = useBoundStore((x) => x.loggedIn);
   const logIn = useBoundStore((x) => x.logIn);
   const setUser = useBoundStore((x) => x.setUser);
+  const setCourse = useBoundStore((x) => x.setCourse);
 
   const [dni, setDni] = useState("");
   const [password, setPassword] = useState("");
@@ -61,6 +62,10 @@ export const LoginScreen = ({
       const data = await response.json();
       const jwt = data.access_token;
       localStorage.setItem("token", jwt);
+      // Por defecto el primer curso; con varios se cambia desde el CourseSelector
+      const courses: string[] = data.courses ?? [];
+      localStorage.setItem("courses", JSON.stringify(courses));
+      setCourse(courses[0] ?? "");
 
       const profileRes = await fetch(
         `${process.env.NEXT_PUBLIC_API_URL}/profile`,
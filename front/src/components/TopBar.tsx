@@ -4,6 +4,7 @@ import type { ComponentProps } from "react";
 import React, { useState } from "react";
 import { useBoundStore } from "~/hooks/useBoundStore";
 import { Calendar } from "./Calendar";
+import { CourseSelector } from "./CourseSelector";
 import type { LoginScreenState } from "./LoginScreen";
 import { LoginScreen } from "./LoginScreen";
 import {
@@ -70,7 +71,7 @@ export const TopBar = ({
               case "MORE":
                 return (
                   <div className="flex grow flex-col">
-                    
+                    <CourseSelector />
                     {loggedIn && (
                       <button
                         className="px-5 py-2 text-left uppercase hover:bg-gray-100 rounded-2xl p-4 font-bold hover:bg-gray-300 font-bold text-gray-400"
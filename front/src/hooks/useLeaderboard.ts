@@ -1,5 +1,6 @@
 import { useEffect, useState } from "react";
 import { useBoundStore } from "~/hooks/useBoundStore";
+import { apiHeaders } from "~/utils/api";
 
 type User = {
   DNI: string;
@@ -14,11 +15,14 @@ export const useLeaderboardUsers = (): User[] => {
 
   // Obtenemos datos desde el store:
   const currentDNI = useBoundStore((x) => x.DNI);
+  const course = useBoundStore((x) => x.course);
   
   useEffect(() => {
     const fetchUsers = async () => {
       try {
-        const res = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/users`);
+        const res = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/users`, {
+          headers: apiHeaders(),
+        });
         const data = (await res.json()) as any[];
 
         // Procesamos los usuarios del backend:
@@ -39,7 +43,7 @@ export const useLeaderboardUsers = (): User[] => {
     };
 
     fetchUsers();
-  }, [currentDNI]);
+  }, [currentDNI, course]);
 
   return users;
 };
@@ -1,12 +1,17 @@
 import { useState, useEffect } from "react";
+import { useBoundStore } from "~/hooks/useBoundStore";
+import { apiHeaders } from "~/utils/api";
 
 export const useQuestions = () => {
   const [questions, setQuestions] = useState<any[]>([]);
+  const course = useBoundStore((x) => x.course);
 
   useEffect(() => {
     const fetchQuestions = async () => {
       try {
-        const res = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/questions`);
+        const res = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/questions`, {
+          headers: apiHeaders(),
+        });
         if (!res.ok) {
           throw new Error("Error al obtener preguntas");
         }
@@ -18,7 +23,7 @@ export const useQuestions = () => {
     };
 
     fetchQuestions();
-  }, []);
+  }, [course]);
 
   return questions;
 };
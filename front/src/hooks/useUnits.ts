@@ -1,12 +1,17 @@
 import { useState, useEffect } from "react";
+import { useBoundStore } from "~/hooks/useBoundStore";
+import { apiHeaders } from "~/utils/api";
 
 export const useUnits = () => {
   const [units, setUnits] = useState<any[]>([]);
+  const course = useBoundStore((x) => x.course);
 
   useEffect(() => {
     const fetchUnits = async () => {
       try {
-        const res = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/units`);
+        const res = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/units`, {
+          headers: apiHeaders(),
+        });
         if (!res.ok) {
           throw new Error("Error al obtener unidades");
         }
@@ -18,7 +23,7 @@ export const useUnits = () => {
     };
 
     fetchUnits();
-  }, []);
+  }, [course]);
 
   return units;
 };
@@ -10,8 +10,11 @@ export type UserSlice = {
   joinedAt: dayjs.Dayjs;
   xpThisWeek: number;
   role: string;
+  // Curso activo (se manda en el header X-Course)
+  course: string;
   loggedIn: boolean;
   setUser: (user: { userId: string; DNI: string; name: string; lastname: string; username: string; xpThisWeek?: number; role: string }) => void;
+  setCourse: (course: string) => void;
   logIn: () => void;
   logOut: () => void;
 };
@@ -25,6 +28,7 @@ export const createUserSlice: BoundStateCreator<UserSlice> = (set) => ({
   joinedAt: dayjs(),
   xpThisWeek: 0,
   role: "",
+  course: "",
   loggedIn: false,
 
   setUser: (user) =>
@@ -37,6 +41,11 @@ export const createUserSlice: BoundStateCreator<UserSlice> = (set) => ({
       xpThisWeek: user.xpThisWeek ?? 0,
       role: user.role,
     })),
+  setCourse: (course) => {
+    if (course) localStorage.setItem("course", course);
+    else localStorage.removeItem("course");
+    set(() => ({ course }));
+  },
   logIn: () => set(() => ({ loggedIn: true })),
   logOut: () => set(() => ({ loggedIn: false })),
 });
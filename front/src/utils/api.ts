@@ -0,0 +1,20 @@
+// Headers de los pedidos a la API: el token y el curso elegido. Con el token la
+// API devuelve los datos del curso del usuario; si está en varios cursos hay
+// que indicar cuál con X-Course (si no, responde 400).
+export const apiHeaders = (): Record<string, string> => {
+  const headers: Record<string, string> = {};
+  const token = localStorage.getItem("token");
+  const course = localStorage.getItem("course");
+  if (token) headers.Authorization = `Bearer ${token}`;
+  if (course) headers["X-Course"] = course;
+  return headers;
+};
+
+// Cursos del usuario, guardados al iniciar sesión
+export const storedCourses = (): string[] => {
+  try {
+    return JSON.parse(localStorage.getItem("courses") ?? "[]") as string[];
+  } catch {
+    return [];
+  }
+};